@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+# Uploaded bytes live here in a content-addressed store shared by every session:
+# blobs/<sha256[:2]>/<sha256>, with in-flight copies under tmp/
+SPOOL_ROOT = os.environ.get("CHATBOT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "chatbot_ui_spool"))
+BLOB_DIR = os.path.join(SPOOL_ROOT, "blobs")
+TMP_DIR = os.path.join(SPOOL_ROOT, "tmp")
+CHUNK_SIZE = 1024 * 1024
+
+# Retention: a blob is kept for SPOOL_TTL_SECONDS after it was last uploaded by any session
+SPOOL_TTL_SECONDS = float(os.environ.get("CHATBOT_SPOOL_TTL", str(24 * 3600)))
+PRUNE_INTERVAL_SECONDS = 600
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+
+@dataclass(frozen=True)
+class AttachmentHandle:
+    """Lightweight reference to a spooled upload; this is all session state keeps."""
+    name: str
+    size: int
+    sha256: str
+    path: str
+    # True when identical content was already in the store and nothing new was written
+    deduplicated: bool = False
+
+
+def blob_path(sha256):
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def spool_upload(uploaded_file, chunk_size=CHUNK_SIZE):
+    """Stream an UploadedFile (or any binary file object) into the blob store.
+
+    The content is hashed while it is copied, so the file is read exactly once
+    and never held in memory as a whole. If a blob with the same hash already
+    exists (from this or any other session) the copy is dropped and the
+    existing blob is referenced instead.
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    uploaded_file.seek(0)
+    fd, tmp_path = tempfile.mkstemp(dir=TMP_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = uploaded_file.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.remove(tmp_path)
+            # Re-uploading content counts as use, so retention restarts from now
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    maybe_prune_spool()
+    return AttachmentHandle(name=uploaded_file.name, size=size, sha256=sha256, path=path,
+                            deduplicated=deduplicated)
+
+
+def prune_spool(ttl=SPOOL_TTL_SECONDS):
+    """Delete blobs not uploaded within ttl seconds, and in-flight copies abandoned for as long.
+
+    Returns the number of files removed. Files that vanish or are still in
+    use by another process are skipped.
+    """
+    cutoff = time.time() - ttl
+    removed = 0
+    for directory in (BLOB_DIR, TMP_DIR):
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+    return removed
+
+
+def maybe_prune_spool():
+    """Run prune_spool at most once per PRUNE_INTERVAL_SECONDS per process."""
+    global _last_prune
+    with _prune_lock:
+        now = time.monotonic()
+        if _last_prune and now - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = now
+    prune_spool()
+
@@ -0,0 +1,230 @@
+from typing import Optional, Any, Dict, Iterator, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import os
+import json
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+
+BASE_URL = os.environ.get("CHATBOT_BASE_URL", "http://localhost:8000")
+
+# Connection pool / timeout defaults, overridable per deployment
+POOL_SIZE = int(os.environ.get("CHATBOT_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.environ.get("CHATBOT_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("CHATBOT_READ_TIMEOUT", "30"))
+
+# When unset the apps keep using their in-file mock responses
+USE_BACKEND = os.environ.get("CHATBOT_USE_BACKEND", "0") == "1"
+# Ask /process_state for a chunked JSON-lines reply instead of one dict
+STREAM_RESPONSES = USE_BACKEND and os.environ.get("CHATBOT_STREAM", "0") == "1"
+
+# Attachment upload tuning
+UPLOAD_CHUNK_SIZE = int(os.environ.get("CHATBOT_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_WORKERS = int(os.environ.get("CHATBOT_UPLOAD_WORKERS", "4"))
+UPLOAD_RETRIES = 5
+
+
+class BackendClient:
+    """Thin wrapper around a pooled, keep-alive requests.Session for the chat backend."""
+
+    def __init__(self, base_url=BASE_URL, pool_size=POOL_SIZE,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+
+        # One adapter per scheme; pool_maxsize bounds the number of kept-alive
+        # sockets. The pool does not block: waiting for a free connection is not
+        # covered by the request timeout, so a caller finding the pool busy (long
+        # streams, upload workers) opens a short-lived extra connection instead.
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+    def _post(self, path, timeout=None, **kwargs):
+        response = self.session.post(f"{self.base_url}{path}", timeout=timeout or self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def start_chat(self, user_id, timeout=None) -> Dict[str, Any]:
+        return self._post("/start_chat", params={"user_id": user_id}, timeout=timeout)
+
+    def process_state(self, chat_request, timeout=None) -> Dict[str, Any]:
+        return self._post("/process_state", json=chat_request, timeout=timeout)
+
+    def fetch_records_page(self, query_id, cursor=None, page_size=50, format="json", timeout=None) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/records", timeout=timeout or self.timeout,
+                                    params={"query_id": query_id, "cursor": cursor,
+                                            "page_size": page_size, "format": format})
+        response.raise_for_status()
+        return response.json()
+
+    def stream_process_state(self, chat_request, timeout=None) -> Iterator[Dict[str, Any]]:
+        """Yield the events of a streamed /process_state reply.
+
+        The body is newline-delimited JSON:
+            {"type": "meta", "session_id": ..., "state": ...}
+            {"type": "delta", "index": 0, "main_text": "<chunk>"}   (repeated)
+            {"type": "done", "response": {<full ChatResponse>}}
+        """
+        with self.session.post(f"{self.base_url}/process_state", json=chat_request,
+                               params={"stream": "1"}, stream=True,
+                               timeout=timeout or self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+
+    def upload_attachment(self, handle, session_id, chunk_size=UPLOAD_CHUNK_SIZE,
+                          max_retries=UPLOAD_RETRIES) -> Dict[str, Any]:
+        """Upload a spooled attachment in fixed-size chunks, resuming after dropped connections.
+
+        POST /uploads opens (or re-opens) the upload and reports how many bytes
+        the server already has; if it already stores identical content the
+        upload is complete at once and nothing is sent. Each PUT
+        /uploads/{id}?offset=N appends one chunk read straight from disk.
+
+        Connection errors, timeouts, 5xx replies and 422 (the server rejected
+        the assembled file and restarted the upload) are retried with backoff:
+        the client re-opens the upload, which reports the server's offset, and
+        carries on from there. Any other error, or running out of retries,
+        raises a requests.RequestException.
+        """
+        init = {"session_id": session_id, "name": handle.name, "size": handle.size, "sha256": handle.sha256}
+        status = None  # None until the upload is (re-)opened
+        retries = 0
+
+        with open(handle.path, "rb") as f:
+            while status is None or not status.get("complete"):
+                try:
+                    if status is None:
+                        response = self.session.post(f"{self.base_url}/uploads", json=init, timeout=self.timeout)
+                    else:
+                        f.seek(status["offset"])
+                        response = self.session.put(
+                            f"{self.base_url}/uploads/{status['upload_id']}",
+                            params={"offset": status["offset"]},
+                            data=f.read(chunk_size),
+                            headers={"Content-Type": "application/octet-stream"},
+                            timeout=self.timeout,
+                        )
+                    if response.status_code >= 500 or response.status_code == 422:
+                        raise requests.ConnectionError(f"Upload failed with {response.status_code}",
+                                                       response=response)
+                    if response.status_code != 409:
+                        # 409 means the server holds a different offset; its body says which
+                        response.raise_for_status()
+                    status = response.json()
+                    retries = 0
+                except (requests.ConnectionError, requests.Timeout):
+                    retries += 1
+                    if retries > max_retries:
+                        raise
+                    time.sleep(min(2 ** retries * 0.1, 5))
+                    status = None
+        return status
+
+    def upload_attachments(self, handles, session_id, workers=UPLOAD_WORKERS) -> List[Dict[str, Any]]:
+        """Upload several attachments in parallel over the shared connection pool."""
+        # Identical content attached twice in one batch only goes over the wire once
+        unique = list({handle.sha256: handle for handle in handles}.values())
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = dict(zip(
+                (handle.sha256 for handle in unique),
+                pool.map(lambda handle: self.upload_attachment(handle, session_id), unique)
+            ))
+        return [results[handle.sha256] for handle in handles]
+
+    def close(self):
+        self.session.close()
+
+
+@st.cache_resource
+def get_backend_client(base_url: Optional[str] = None, pool_size: Optional[int] = None) -> BackendClient:
+    """Return the process-wide BackendClient (created once per server process, not per rerun)."""
+    return BackendClient(base_url or BASE_URL, pool_size or POOL_SIZE)
+
+
+def build_chat_request(human_prompt=None, files=None, data=None):
+    """Build the /process_state request body from the current session."""
+    chat_request = {
+        "session_id": st.session_state.session_id,
+        "user_id": st.session_state.get("user_id", "temp"),
+        "sender": "user",
+        "state": st.session_state.state,
+        "capabilities": st.session_state.get("capabilities", []),
+    }
+    if human_prompt or files or data:
+        chat_request["messages"] = {
+            "main_text": human_prompt,
+            "files": files,
+            "data": data,
+            "timestamp": str(datetime.now()),
+        }
+    return chat_request
+
+
+def backend_process_state(human_prompt=None, files=None, data=None):
+    """POST /process_state through the shared client and track the returned state.
+
+    Returns None (after showing the error) when the backend cannot be reached
+    or rejects the request, so the caller can undo the turn and let the user retry.
+    """
+    try:
+        response = get_backend_client().process_state(build_chat_request(human_prompt, files, data))
+    except requests.RequestException as exc:
+        st.error(f"Could not reach the chat backend, please try again. ({exc})")
+        return None
+    st.session_state.state = response["state"]
+    return response
+
+
+def backend_fetch_records_page(query_id, cursor=None, page_size=50):
+    """GET /records for one page; None (after showing the error) when the backend fails."""
+    record_format = "arrow" if "arrow_records" in st.session_state.get("capabilities", []) else "json"
+    try:
+        return get_backend_client().fetch_records_page(query_id, cursor, page_size, record_format)
+    except requests.RequestException as exc:
+        st.error(f"Could not load the records page, please try again. ({exc})")
+        return None
+
+
+def backend_stream_process_state(human_prompt=None, files=None, data=None):
+    """Streaming variant of backend_process_state; yields events as they arrive."""
+    chat_request = build_chat_request(human_prompt, files, data)
+    for event in get_backend_client().stream_process_state(chat_request):
+        if event.get("type") == "meta" and event.get("state"):
+            st.session_state.state = event["state"]
+        yield event
+
+
+def backend_upload_attachments(handles):
+    """Push spooled attachments for the current session to the backend.
+
+    Returns None (after showing the error) when an upload fails for good, so
+    the caller can leave the uploader live for another attempt.
+    """
+    try:
+        return get_backend_client().upload_attachments(handles, st.session_state.session_id)
+    except requests.RequestException as exc:
+        st.error(f"Could not upload the attachments, please try again. ({exc})")
+        return None
+
+
+def backend_start_chat(user_id):
+    """POST /start_chat through the shared client and store the new session.
+
+    Returns None (after showing the error) when the backend cannot be reached;
+    session_id is then left unset so the next run tries again.
+    """
+    try:
+        response = get_backend_client().start_chat(user_id)
+    except requests.RequestException as exc:
+        st.error(f"Could not start a chat with the backend, please try again. ({exc})")
+        return None
+    st.session_state.session_id = response["session_id"]
+    st.session_state.state = response["state"]
+    return response
@@ -0,0 +1,270 @@
+"""Rerun-latency benchmark for the chat apps, driven by Streamlit's headless AppTest.
+
+Scripts N chat turns against an app and reports p50/p95 rerun time and the
+session_state footprint each time the history reaches a checkpoint size. For
+the form scenario it also reports form runs per click: how many times the
+live form executed for each interaction (test_app6 counts them in
+st.session_state.form_runs).
+
+    python benchmarks/bench_rerun.py --scenario buttons --turns 200
+    python benchmarks/bench_rerun.py --scenario all --json bench.json
+    python benchmarks/bench_rerun.py --scenario all --baseline bench.json --tolerance 0.25
+
+Scenarios
+    buttons  test_app6.py   click the first option button (on_button_click) every turn
+    form     test_app6.py   open "Show Form", then Edit/Save a field in display_form every turn
+    records  test_app4.py   alternate "Show Records" and a text turn, growing records tables
+    select   test_app10.py  keep asking for clickable records, growing selectable tables
+                            (AppTest cannot emit dataframe row-selection events, so
+                            on_record_select itself is not driven)
+"""
+from typing import Dict
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from types import MappingProxyType
+
+from streamlit.testing.v1 import AppTest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_TIMEOUT = 60
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def session_keys(state):
+    """User-visible session_state keys, whichever wrapper AppTest hands out."""
+    candidates = [state]
+    while getattr(candidates[-1], "_state", None) is not None:
+        candidates.append(candidates[-1]._state)
+    for candidate in candidates:
+        filtered = getattr(candidate, "filtered_state", None)
+        if filtered is not None:
+            return list(filtered.keys())
+        if hasattr(candidate, "_keys"):
+            return [key for key in candidate._keys() if not str(key).startswith("$$")]
+    raise RuntimeError(f"Cannot list the keys of {type(state).__name__}; session size would be meaningless")
+
+
+def deep_sizeof(obj, seen):
+    """Bytes reachable from obj (each object counted once), following containers and attributes."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):  # pandas DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "nbytes") and hasattr(obj, "dtype"):  # numpy array
+        return sys.getsizeof(obj) + int(obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, (dict, MappingProxyType)):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += deep_sizeof(vars(obj), seen)
+    for klass in type(obj).__mro__:
+        for name in getattr(klass, "__slots__", ()):
+            if name not in ("__dict__", "__weakref__") and hasattr(obj, name):
+                size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+
+def session_bytes(at):
+    """Session footprint: deep size of every session_state value, shared objects counted once."""
+    state = at.session_state
+    seen = set()
+    return sum(deep_sizeof(state[key], seen) for key in session_keys(state))
+
+
+def history(at):
+    return at.session_state["history"] if "history" in at.session_state else []
+
+
+def last_ai_index(at):
+    items = history(at)
+    for i in range(len(items) - 1, -1, -1):
+        if items[i].origin == "ai":
+            return i
+    return -1
+
+
+def find_button(at, label=None, key_prefix=""):
+    for button in at.button:
+        if (label is None or button.label == label) and (button.key or "").startswith(key_prefix):
+            return button
+    return None
+
+
+class Samples(list):
+    """Rerun timings, plus the form executions each interaction caused when the app counts them."""
+
+    def __init__(self, last_form_runs=None):
+        super().__init__()
+        self.form_runs = []
+        self.last_form_runs = last_form_runs
+
+
+def form_runs(at):
+    return at.session_state["form_runs"] if "form_runs" in at.session_state else None
+
+
+def timed(samples, action):
+    """Run one AppTest interaction and record how long the rerun took."""
+    start = time.perf_counter()
+    at = action.run(timeout=RUN_TIMEOUT)
+    samples.append(time.perf_counter() - start)
+    count = form_runs(at)
+    if count is not None and samples.last_form_runs is not None and count > samples.last_form_runs:
+        samples.form_runs.append(count - samples.last_form_runs)
+    samples.last_form_runs = count
+
+
+def submit_text(at, samples, text):
+    at.text_input(key="user_input").input(text)
+    timed(samples, find_button(at, label="Submit").click())
+
+
+# One function per scenario: perform a single chat turn, appending rerun timings to samples
+
+def turn_buttons(at, samples):
+    i = last_ai_index(at)
+    timed(samples, at.button(key=f"btn_{i}_0").click())
+
+
+def turn_form(at, samples):
+    i = last_ai_index(at)
+    if getattr(history(at)[i], "enable_form", False):
+        timed(samples, at.button(key=f"source_edit_{i}").click())
+        timed(samples, find_button(at, label="Save", key_prefix="save_source").click())
+        # Submit so the conversation moves on and history keeps growing
+        timed(samples, at.button(key=f"submit_form_{i}").click())
+    else:
+        show_form = find_button(at, label="Show Form", key_prefix=f"btn_{i}_") or at.button(key=f"btn_{i}_0")
+        timed(samples, show_form.click())
+
+
+def turn_records(at, samples):
+    i = last_ai_index(at)
+    show_records = find_button(at, label="Show Records", key_prefix=f"btn_{i}_")
+    if show_records is not None:
+        timed(samples, show_records.click())
+    else:
+        submit_text(at, samples, "hello")
+
+
+def turn_select(at, samples):
+    i = last_ai_index(at)
+    show_records = find_button(at, label="Show Records", key_prefix=f"btn_{i}_")
+    if show_records is not None:
+        timed(samples, show_records.click())
+    else:
+        submit_text(at, samples, "show records")
+
+
+SCENARIOS: Dict[str, tuple] = {
+    "buttons": ("test_app6.py", turn_buttons),
+    "form": ("test_app6.py", turn_form),
+    "records": ("test_app4.py", turn_records),
+    "select": ("test_app10.py", turn_select),
+}
+
+
+def run_scenario(name, turns, checkpoints):
+    script, turn = SCENARIOS[name]
+    os.chdir(REPO_ROOT)  # apps load static/styles.css relative to the cwd
+    at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=RUN_TIMEOUT)
+    at.run()
+
+    results = []
+    samples = Samples(form_runs(at))
+    pending = sorted(checkpoints)
+    for _ in range(turns):
+        turn(at, samples)
+        if at.exception:
+            raise RuntimeError(f"{name}: app raised {at.exception[0].value}")
+        size = len(history(at))
+        while pending and size >= pending[0]:
+            results.append({
+                "scenario": name,
+                "history": size,
+                "reruns": len(samples),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+                "session_kb": round(session_bytes(at) / 1024, 1),
+                "form_runs_per_click": round(statistics.fmean(samples.form_runs), 2) if samples.form_runs else None,
+            })
+            samples = Samples(samples.last_form_runs)
+            pending.pop(0)
+        if not pending:
+            break
+    return results
+
+
+def print_table(rows):
+    header = (f"{'scenario':<10}{'history':>9}{'reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}"
+              f"{'session KB':>12}{'form runs':>11}")
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        runs = r.get("form_runs_per_click")
+        print(f"{r['scenario']:<10}{r['history']:>9}{r['reruns']:>8}{r['p50_ms']:>10}"
+              f"{r['p95_ms']:>10}{r['mean_ms']:>10}{r['session_kb']:>12}{'-' if runs is None else runs:>11}")
+
+
+def compare(rows, baseline_path, tolerance):
+    """Return the rows whose p95 regressed by more than `tolerance` against the baseline."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["history"]): r for r in json.load(f)}
+    regressions = []
+    for r in rows:
+        base = baseline.get((r["scenario"], r["history"]))
+        if base and base["p95_ms"] and r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append((r, base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--checkpoints", default="10,25,50,100,200",
+                        help="Comma separated history sizes to report at")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare p95 against a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    checkpoints = [int(c) for c in args.checkpoints.split(",") if c]
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+
+    rows = []
+    for name in names:
+        rows.extend(run_scenario(name, args.turns, checkpoints))
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(rows, args.baseline, args.tolerance)
+        for r, base in regressions:
+            print(f"REGRESSION {r['scenario']} @ {r['history']}: p95 {base['p95_ms']} -> {r['p95_ms']} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
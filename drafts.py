@@ -0,0 +1,165 @@
+"""Autosave of in-progress form drafts to a local SQLite store.
+
+Edits are only recorded in memory on the script thread. A single background
+writer flushes each draft once no new edit to it has arrived for
+DRAFT_DEBOUNCE_SECONDS, and at the latest DRAFT_MAX_WAIT_SECONDS after its
+first unsaved edit. The debounce is per draft, so busy sessions never hold
+back a quiet one. Each pending draft keeps only its latest state, so a burst
+of edits becomes one row write. The database runs in WAL mode, so a restore never waits on the
+writer. A restore is one primary-key lookup on (session_id, message_index).
+
+Each draft records the identity of the form it was typed into, and a restore
+only returns it for the same form. Drafts untouched for DRAFT_TTL_SECONDS are
+ignored and deleted by the writer.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import streamlit as st
+
+DRAFTS_DB = os.environ.get("CHATBOT_DRAFTS_DB", os.path.join(tempfile.gettempdir(), "chatbot_ui_drafts.sqlite3"))
+DRAFT_DEBOUNCE_SECONDS = float(os.environ.get("CHATBOT_DRAFT_DEBOUNCE", "1.0"))
+DRAFT_MAX_WAIT_SECONDS = float(os.environ.get("CHATBOT_DRAFT_MAX_WAIT", "10.0"))
+DRAFT_TTL_SECONDS = float(os.environ.get("CHATBOT_DRAFT_TTL", str(7 * 24 * 3600)))
+PRUNE_INTERVAL_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS form_drafts (
+    session_id TEXT NOT NULL,
+    message_index INTEGER NOT NULL,
+    form_id TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (session_id, message_index)
+);
+CREATE INDEX IF NOT EXISTS form_drafts_updated_at ON form_drafts (updated_at);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(form_drafts)")}
+    if columns and "form_id" not in columns:
+        # Store created before drafts recorded their form; such rows never match and expire
+        conn.execute("ALTER TABLE form_drafts ADD COLUMN form_id TEXT NOT NULL DEFAULT ''")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def form_identity(form_data, form_version=None):
+    """Hash of the form a draft belongs to: the server's original data and its version."""
+    encoded = json.dumps([form_version, form_data], sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class DraftStore:
+    def __init__(self, path=DRAFTS_DB, debounce=DRAFT_DEBOUNCE_SECONDS, ttl=DRAFT_TTL_SECONDS,
+                 max_wait=DRAFT_MAX_WAIT_SECONDS):
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.ttl = ttl
+        self.reader = connect(path)
+        self.writer = connect(path)
+        # (session_id, message_index) -> (entry, first_change, last_change), where entry is
+        # the latest (form_id, state), or None to delete
+        self.pending = {}
+        self.last_prune = 0.0
+        self.lock = threading.Lock()  # guards pending and the reader connection
+        self.wake = threading.Event()
+        threading.Thread(target=self._run, name="draft-writer", daemon=True).start()
+
+    def save(self, session_id, message_index, form_id, state):
+        """Record the latest draft; it reaches disk once edits pause for the debounce interval."""
+        self._record((session_id, message_index), (form_id, json.dumps(state, default=str)))
+
+    def discard(self, session_id, message_index):
+        self._record((session_id, message_index), None)
+
+    def _record(self, key, entry):
+        now = time.monotonic()
+        with self.lock:
+            previous = self.pending.get(key)
+            # The max-wait clock runs from the first edit not yet on disk
+            self.pending[key] = (entry, previous[1] if previous else now, now)
+        self.wake.set()
+
+    def load(self, session_id, message_index, form_id):
+        """The saved draft (including one not flushed yet) typed into the form form_id, or None."""
+        with self.lock:
+            key = (session_id, message_index)
+            if key in self.pending:
+                entry = self.pending[key][0]
+            else:
+                entry = self.reader.execute(
+                    "SELECT form_id, state FROM form_drafts "
+                    "WHERE session_id = ? AND message_index = ? AND updated_at >= ?",
+                    (*key, time.time() - self.ttl)
+                ).fetchone()
+        # A draft of a different form at the same position (e.g. the server changed it) is not restored
+        if entry is None or entry[0] != form_id:
+            return None
+        return json.loads(entry[1])
+
+    def _take_due(self, now):
+        """Remove and return the drafts due for writing, plus the seconds until the next one is."""
+        batch = {}
+        next_due = None
+        for key, (entry, first_change, last_change) in list(self.pending.items()):
+            due = min(last_change + self.debounce, first_change + self.max_wait)
+            if due <= now:
+                batch[key] = entry
+                del self.pending[key]
+            elif next_due is None or due < next_due:
+                next_due = due
+        return batch, (None if next_due is None else next_due - now)
+
+    def _run(self):
+        timeout = None
+        while True:
+            # Woken by every edit; otherwise sleep until the earliest pending draft is due
+            self.wake.wait(timeout)
+            with self.lock:
+                self.wake.clear()
+                batch, timeout = self._take_due(time.monotonic())
+            if not batch:
+                continue
+            try:
+                self._flush(batch)
+            except sqlite3.Error:
+                # Put the batch back unless newer edits replaced it, and retry after another debounce
+                now = time.monotonic()
+                with self.lock:
+                    for key, entry in batch.items():
+                        self.pending.setdefault(key, (entry, now, now))
+                timeout = self.debounce if timeout is None else min(timeout, self.debounce)
+
+    def _flush(self, batch):
+        now = time.time()
+        upserts = [(sid, index, *entry, now) for (sid, index), entry in batch.items() if entry is not None]
+        deletes = [key for key, entry in batch.items() if entry is None]
+        with self.writer:
+            self.writer.executemany(
+                "INSERT INTO form_drafts (session_id, message_index, form_id, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id, message_index) DO UPDATE SET "
+                "form_id = excluded.form_id, state = excluded.state, updated_at = excluded.updated_at",
+                upserts
+            )
+            self.writer.executemany(
+                "DELETE FROM form_drafts WHERE session_id = ? AND message_index = ?", deletes
+            )
+            # Drafts of abandoned sessions are never discarded explicitly; expire them
+            if now - self.last_prune >= PRUNE_INTERVAL_SECONDS:
+                self.writer.execute("DELETE FROM form_drafts WHERE updated_at < ?", (now - self.ttl,))
+                self.last_prune = now
+
+
+@st.cache_resource
+def get_draft_store():
+    return DraftStore()
@@ -0,0 +1,189 @@
+"""Compiled schema for FORM_RESP messages.
+
+A form response carries four per-field config dicts: mandatory, editable,
+filter options and filter type. compile_form turns them into one FieldSpec
+per field when the message arrives. display_form then only emits widgets:
+labels, widget kinds, option lookups and validators are already resolved.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import json
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+# Widget kinds
+DATE = "date"
+ATTACHMENTS = "attachments"
+SELECT = "select"
+MULTISELECT = "multiselect"
+TEXT_AREA = "text_area"
+TEXT = "text"
+
+# Fields whose widget is fixed by name rather than by filter config
+DATE_FIELDS = {"detected_date"}
+ATTACHMENT_FIELDS = {"sample_data_attachements"}
+LONG_TEXT_FIELDS = {"data_concern"}
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def field_label(name):
+    return name.replace("_", " ").title()
+
+
+# Validators take (spec, value) and return an error message or None
+
+def required(spec, value):
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return f"{spec.label} is required"
+    return None
+
+
+def valid_date(spec, value):
+    if value in (None, ""):
+        return None
+    try:
+        datetime.strptime(str(value), DATE_FORMAT)
+    except ValueError:
+        return f"{spec.label} must be a date ({DATE_FORMAT})"
+    return None
+
+
+def one_of_options(spec, value):
+    if value is None or spec.index_of(value, None) is not None:
+        return None
+    return f"{spec.label} must be one of the listed options"
+
+
+def all_of_options(spec, value):
+    if not value:
+        return None
+    values = value if isinstance(value, list) else [value]
+    if all(spec.index_of(v, None) is not None for v in values):
+        return None
+    return f"{spec.label} must only contain listed options"
+
+
+@dataclass(frozen=True, slots=True)
+class FieldSpec:
+    name: str
+    label: str
+    kind: str
+    mandatory: bool = False
+    editable: bool = False
+    options: Tuple[Any, ...] = ()
+    # option value -> position in options
+    option_index: Mapping[Any, int] = field(default_factory=lambda: MappingProxyType({}))
+    # Content hash of options, so identical lists in different messages share one search index
+    options_digest: str = ""
+    validators: Tuple[Callable[["FieldSpec", Any], Optional[str]], ...] = ()
+
+    def index_of(self, value, default=0):
+        try:
+            return self.option_index.get(value, default)
+        except TypeError:  # unhashable value, e.g. a list sent for a single-select field
+            return default
+
+    def validate(self, value):
+        """Error messages for value, empty when it is valid."""
+        return [message for message in (check(self, value) for check in self.validators) if message]
+
+    def validate_change(self, value, original):
+        """Full checks when value differs from the server's original, else only the required check."""
+        if value != original:
+            return self.validate(value)
+        if self.mandatory:
+            message = required(self, value)
+            return [message] if message else []
+        return []
+
+
+@dataclass(frozen=True, slots=True)
+class FormSchema:
+    fields: Tuple[FieldSpec, ...]
+    # Mandatory fields that have no row in the form but must still be filled in
+    unlisted_required: Tuple[FieldSpec, ...] = ()
+    # field name -> FieldSpec, for callbacks that only know the field's name
+    by_name: Mapping[str, FieldSpec] = field(default_factory=lambda: MappingProxyType({}))
+
+    def validate(self, values, original):
+        """Errors for a whole form: required checks everywhere, full checks on changed fields only.
+
+        Values as sent by the server are not re-checked against the option
+        lists, so a pristine form can always be submitted as-is.
+        """
+        errors = []
+        for spec in self.fields + self.unlisted_required:
+            errors.extend(spec.validate_change(values.get(spec.name), original.get(spec.name)))
+        return errors
+
+    def changes(self, values, original):
+        """The fields whose value differs from the server's original form_data."""
+        return {spec.name: values.get(spec.name) for spec in self.fields
+                if values.get(spec.name) != original.get(spec.name)}
+
+
+def widget_kind(name, options, filter_type):
+    if name in DATE_FIELDS:
+        return DATE
+    if name in ATTACHMENT_FIELDS:
+        return ATTACHMENTS
+    if options is not None:
+        return MULTISELECT if filter_type == "multi" else SELECT
+    if name in LONG_TEXT_FIELDS:
+        return TEXT_AREA
+    return TEXT
+
+
+def options_digest(options):
+    if not options:
+        return ""
+    encoded = json.dumps(options, default=str, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def compile_field(name, mandatory, editable, options, filter_type):
+    kind = widget_kind(name, options, filter_type)
+    options = tuple(options or ())
+    validators = []
+    if mandatory:
+        validators.append(required)
+    if kind == DATE:
+        validators.append(valid_date)
+    elif kind == SELECT:
+        validators.append(one_of_options)
+    elif kind == MULTISELECT:
+        validators.append(all_of_options)
+    return FieldSpec(
+        name=name,
+        label=field_label(name),
+        kind=kind,
+        mandatory=bool(mandatory),
+        editable=bool(editable),
+        options=options,
+        # First occurrence wins, matching list.index
+        option_index=MappingProxyType({value: n for n, value in reversed(list(enumerate(options)))}),
+        options_digest=options_digest(options),
+        validators=tuple(validators),
+    )
+
+
+def compile_form(form_data, mandatory_fields=None, editable_fields=None, filter_data=None, filter_config=None):
+    form_data = form_data or {}
+    mandatory_fields = mandatory_fields or {}
+    editable_fields = editable_fields or {}
+    filter_data = filter_data or {}
+    filter_config = filter_config or {}
+    fields = tuple(
+        compile_field(name, mandatory_fields.get(name, False), editable_fields.get(name, False),
+                      filter_data.get(name), filter_config.get(name))
+        for name in form_data
+    )
+    unlisted = tuple(
+        compile_field(name, True, False, None, None)
+        for name, is_required in mandatory_fields.items()
+        if is_required and name not in form_data
+    )
+    return FormSchema(fields=fields, unlisted_required=unlisted,
+                      by_name=MappingProxyType({spec.name: spec for spec in fields}))
@@ -0,0 +1,392 @@
+"""Local stand-in for the chat backend.
+
+Serves the same /start_chat and /process_state contracts the apps mock inline
+(INITIAL_RESP, RECORDS_RESP, FORM_RESP, FORM_SUBMITTED), with knobs for
+artificial latency, payload size and error rate so the UI can be load-tested
+against a real network boundary.
+
+    python mock_backend.py --port 8000 --latency-ms 150 --records 5000 --error-rate 0.01
+"""
+from typing import Optional
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import tempfile
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from schemas import BotMessage, ChatResponse, ChatRequest, RecordsPage
+from records_codec import ARROW_AVAILABLE, encode_arrow
+
+
+class MockConfig:
+    """Runtime knobs, read from the environment and overridable from the CLI."""
+    latency_ms = float(os.environ.get("MOCK_LATENCY_MS", "0"))
+    latency_jitter_ms = float(os.environ.get("MOCK_LATENCY_JITTER_MS", "0"))
+    error_rate = float(os.environ.get("MOCK_ERROR_RATE", "0"))
+    records = int(os.environ.get("MOCK_RECORDS", "5"))
+    page_size = int(os.environ.get("MOCK_PAGE_SIZE", "50"))
+    token_delay_ms = float(os.environ.get("MOCK_TOKEN_DELAY_MS", "30"))
+    upload_dir = os.environ.get("MOCK_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "chatbot_ui_mock_uploads"))
+
+
+config = MockConfig()
+app = FastAPI(title="chatbot_ui mock backend")
+
+
+MOCK_RECORDS = [
+    {"Reporting DCID": 12345, "Phase": "Planning", "Data Owner": "John Doe",
+     "Status Label": "Active", "Created Date": "2024-03-01"},
+    {"Reporting DCID": 12346, "Phase": "Execution", "Data Owner": "Jane Smith",
+     "Status Label": "Pending", "Created Date": "2024-03-02"},
+    {"Reporting DCID": 12347, "Phase": "Review", "Data Owner": "Bob Johnson",
+     "Status Label": "Completed", "Created Date": "2024-03-03"},
+    {"Reporting DCID": 12348, "Phase": "Closed", "Data Owner": "Alice Brown",
+     "Status Label": "Archived", "Created Date": "2024-03-04"},
+    {"Reporting DCID": 12349, "Phase": "Planning", "Data Owner": "Charlie Green",
+     "Status Label": "Active", "Created Date": "2024-03-05"}
+]
+
+# The mock form never changes server-side, so every delta submission is against version 1
+FORM_VERSION = 1
+
+
+def build_records(count, start=0):
+    """Cycle the mock records to produce rows start..start+count with unique DCIDs."""
+    records = []
+    for n in range(start, start + count):
+        record = dict(MOCK_RECORDS[n % len(MOCK_RECORDS)])
+        record["Reporting DCID"] = 12345 + n
+        records.append(record)
+    return records
+
+
+def records_page(query_id, cursor, page_size, arrow=False):
+    """Page of the (generated) records result; the cursor is the opaque row offset."""
+    offset = int(cursor or 0)
+    count = max(0, min(page_size, config.records - offset))
+    next_offset = offset + count
+    rows = build_records(count, offset)
+    page = RecordsPage(
+        query_id=query_id,
+        total=config.records,
+        page_size=page_size,
+        row_count=count,
+        next_cursor=str(next_offset) if next_offset < config.records else None,
+    )
+    if arrow and ARROW_AVAILABLE:
+        page.rows_arrow = encode_arrow(rows)
+    else:
+        page.rows = rows
+    return page
+
+
+def initial_resp():
+    return [BotMessage(
+        main_text='Hello! How can I assist you?',
+        buttons=['Check status', 'Submit concern', 'Show Records', 'Filter Data', 'Show Form'],
+        enable_attachment=True,
+    )]
+
+
+def records_resp(paged=False, arrow=False):
+    # Clients that understand paging get the first page plus a cursor instead of every row
+    if paged:
+        data = records_page("all", None, config.page_size, arrow).model_dump()
+    else:
+        data = build_records(config.records)
+    return [BotMessage(
+        main_text='Here are the records you requested:',
+        buttons=[],
+        data=data,
+        enable_text=True,
+        enable_records=True,
+        records_clickable=True,
+    )]
+
+
+def form_resp(delta=False):
+    sample_data = {
+        'data_concern': " The description",
+        'source': 'The Source',
+        'detected_csi_application': ['D book'],
+        'euc': None,
+        'impacted_business_process': None,
+        'impacted_data_elements': ['Market'],
+        'frequency': 'Isolated Instance',
+        'detected_date': '2025-03-17',
+        'sample_data_attachements': ['Screenshot 2025-01-14 121747.png', 'Screenshot 2025-01-23 154637.png'],
+        'primary_contact': ['SOEID1'],
+        'on_behalf_of': None,
+    }
+    mandatory_config = {
+        'data_concern': True,
+        'source': True,
+        'detected_csi_application': False,
+        'euc': False,
+        'impacted_business_process': False,
+        'impacted_data_elements': False,
+        'frequency': True,
+        'detected_date': True,
+        'sample_data_attachements': False,
+        'primary_contact': True,
+        'on_behalf_of': False,
+    }
+    editable_config = {
+        'data_concern': False,
+        'source': True,
+        'detected_csi_application': True,
+        'euc': True,
+        'impacted_business_process': True,
+        'impacted_data_elements': True,
+        'frequency': True,
+        'detected_date': True,
+        'sample_data_attachements': True,
+        'primary_contact': True,
+        'on_behalf_of': True,
+    }
+    filter_data = {
+        'data_concern': None,
+        'source': ['A', 'B', 'C'],
+        'detected_csi_application': ['A1', 'A2', 'A3', 'A4', 'A5'],
+        'euc': ['C1', 'C2', 'C3'],
+        'impacted_business_process': ['B1', 'B2', 'B3', 'B4'],
+        'impacted_data_elements': ['D1', 'D2', 'D3', 'D4'],
+        'frequency': ['I', 'O', 'F'],
+        'detected_date': None,
+        'sample_data_attachements': None,
+        'primary_contact': ['S1', 'S2', 'S3'],
+        'on_behalf_of': ['S1', 'S2', 'S3']
+    }
+    filter_config = {
+        'data_concern': None,
+        'source': 'single',
+        'detected_csi_application': 'single',
+        'euc': 'single',
+        'impacted_business_process': 'multi',
+        'impacted_data_elements': 'multi',
+        'frequency': 'single',
+        'detected_date': None,
+        'sample_data_attachements': None,
+        'primary_contact': 'single',
+        'on_behalf_of': 'single',
+    }
+    return [BotMessage(
+        main_text='Here is the form:',
+        data={
+            'form_data': sample_data,
+            'mandatory_fields': mandatory_config,
+            'editable_fields': editable_config,
+            'filter_data': filter_data,
+            'filter_config': filter_config,
+            # Clients that understand deltas submit only changed fields against this version
+            **({'form_version': FORM_VERSION} if delta else {})
+        },
+        buttons=['Submit Form'],
+        enable_form=True,
+    )]
+
+
+def form_submitted():
+    return [BotMessage(
+        main_text='Form submitted successfully! Thank you for your input.',
+        buttons=['Check status', 'Submit concern', 'Show Records'],
+        enable_text=True,
+    )]
+
+
+def route(request: ChatRequest):
+    """Pick the mock reply for a request, mirroring process_state in test_app6."""
+    human_prompt = request.messages.main_text if request.messages else None
+    data = request.messages.data if request.messages else None
+
+    if human_prompt and "show records" in human_prompt.lower():
+        return "RECORDS_RESP", records_resp("paged_records" in request.capabilities,
+                                            "arrow_records" in request.capabilities)
+    if human_prompt and "show form" in human_prompt.lower():
+        return "FORM_RESP", form_resp("form_delta" in request.capabilities)
+    if human_prompt == "form_submitted" and isinstance(data, dict) and ("form_data" in data or "form_changes" in data):
+        return "FORM_SUBMITTED", form_submitted()
+    return "INITIAL_RESP", initial_resp()
+
+
+async def simulate_network():
+    """Apply the configured latency and randomly fail at the configured error rate."""
+    delay = config.latency_ms + random.uniform(0, config.latency_jitter_ms)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if config.error_rate and random.random() < config.error_rate:
+        raise HTTPException(status_code=503, detail="Injected backend error")
+
+
+@app.post("/start_chat")
+async def start_chat(user_id: str):
+    await simulate_network()
+    return {"session_id": uuid.uuid4().hex, "user_id": user_id, "state": "INITIAL"}
+
+
+@app.post("/process_state")
+async def process_state(request: ChatRequest, stream: Optional[int] = 0):
+    await simulate_network()
+    state, messages = route(request)
+    response = ChatResponse(
+        session_id=request.session_id,
+        user_id=request.user_id,
+        sender="bot",
+        state=state,
+        messages=messages,
+    )
+    if not stream:
+        return response
+    return StreamingResponse(stream_response(response), media_type="application/x-ndjson")
+
+
+async def stream_response(response: ChatResponse):
+    """Emit a ChatResponse as meta / delta / done JSON lines, word by word."""
+    yield json.dumps({"type": "meta", "session_id": response.session_id, "state": response.state}) + "\n"
+    for index, message in enumerate(response.messages):
+        words = (message.main_text or "").split(" ")
+        for n, word in enumerate(words):
+            chunk = word if n == len(words) - 1 else word + " "
+            yield json.dumps({"type": "delta", "index": index, "main_text": chunk}) + "\n"
+            if config.token_delay_ms:
+                await asyncio.sleep(config.token_delay_ms / 1000)
+    yield json.dumps({"type": "done", "response": json.loads(response.model_dump_json())}) + "\n"
+
+
+class UploadInit(BaseModel):
+    session_id: str
+    name: str
+    size: int
+    sha256: str
+
+
+# upload_id -> {"name", "size", "sha256", "offset", "path", "complete"}
+uploads = {}
+
+
+def blob_path(sha256):
+    """Content-addressed location shared by every session's uploads."""
+    return os.path.join(config.upload_dir, "blobs", sha256[:2], sha256)
+
+
+def upload_status(upload_id):
+    upload = uploads[upload_id]
+    return {"upload_id": upload_id, "offset": upload["offset"], "size": upload["size"],
+            "complete": upload["complete"], "deduplicated": False}
+
+
+def finish_upload(upload):
+    """Verify the assembled file against the announced hash and move it into place."""
+    digest = hashlib.sha256()
+    with open(upload["path"], "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    if digest.hexdigest() != upload["sha256"]:
+        # Start over in the same (now empty) part file, so re-opening the upload resumes from 0
+        open(upload["path"], "wb").close()
+        upload["offset"] = 0
+        raise HTTPException(status_code=422, detail="Checksum mismatch, upload restarted")
+    final_path = blob_path(upload["sha256"])
+    if os.path.exists(final_path):
+        # Another session finished the same content first
+        os.remove(upload["path"])
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(upload["path"], final_path)
+    upload["path"] = final_path
+    upload["complete"] = True
+
+
+@app.post("/uploads")
+async def init_upload(init: UploadInit):
+    """Open an upload, or report progress on one already under way (resume)."""
+    await simulate_network()
+    if os.path.exists(blob_path(init.sha256)):
+        # Already stored: the client can skip the transfer entirely
+        return {"upload_id": None, "offset": init.size, "size": init.size,
+                "complete": True, "deduplicated": True}
+    # Deterministic id so a client that lost its connection can re-open the same upload
+    upload_id = hashlib.sha256(f"{init.session_id}:{init.sha256}:{init.size}".encode()).hexdigest()[:32]
+    if upload_id not in uploads:
+        os.makedirs(config.upload_dir, exist_ok=True)
+        path = os.path.join(config.upload_dir, f"{upload_id}.part")
+        open(path, "wb").close()
+        uploads[upload_id] = {"name": init.name, "size": init.size, "sha256": init.sha256,
+                              "offset": 0, "path": path, "complete": False}
+        if init.size == 0:
+            finish_upload(uploads[upload_id])
+    return upload_status(upload_id)
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    await simulate_network()
+    if upload_id not in uploads:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    upload = uploads[upload_id]
+    if upload["complete"] or offset != upload["offset"]:
+        return JSONResponse(status_code=409, content=upload_status(upload_id))
+
+    chunk = await request.body()
+    if offset + len(chunk) > upload["size"]:
+        raise HTTPException(status_code=400, detail="Chunk runs past the announced size")
+    with open(upload["path"], "r+b") as f:
+        f.seek(offset)
+        f.write(chunk)
+    upload["offset"] = offset + len(chunk)
+    if upload["offset"] == upload["size"]:
+        finish_upload(upload)
+    return upload_status(upload_id)
+
+
+@app.get("/records")
+async def get_records(query_id: str, cursor: Optional[str] = None, page_size: int = 50, format: str = "json"):
+    await simulate_network()
+    return records_page(query_id, cursor, page_size, arrow=format == "arrow")
+
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    if upload_id not in uploads:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    return upload_status(upload_id)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms)
+    parser.add_argument("--latency-jitter-ms", type=float, default=config.latency_jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate)
+    parser.add_argument("--records", type=int, default=config.records,
+                        help="Rows returned by RECORDS_RESP (payload size)")
+    parser.add_argument("--page-size", type=int, default=config.page_size,
+                        help="Rows in the first page for clients that request paged records")
+    parser.add_argument("--upload-dir", default=config.upload_dir)
+    parser.add_argument("--token-delay-ms", type=float, default=config.token_delay_ms,
+                        help="Delay between streamed main_text chunks")
+    args = parser.parse_args()
+
+    config.latency_ms = args.latency_ms
+    config.latency_jitter_ms = args.latency_jitter_ms
+    config.error_rate = args.error_rate
+    config.records = args.records
+    config.token_delay_ms = args.token_delay_ms
+    config.upload_dir = args.upload_dir
+    config.page_size = args.page_size
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
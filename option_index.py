@@ -0,0 +1,72 @@
+"""Typeahead over large form option lists.
+
+Lists longer than TYPEAHEAD_THRESHOLD are never handed to a widget as a
+whole. An OptionIndex, built once per option list and shared through
+st.cache_resource, returns the top matches for what has been typed. Prefix
+matches come from a sorted key list via bisect, substring matches from a
+trigram index.
+"""
+from bisect import bisect_left
+import streamlit as st
+
+from records_cache import FrameCache
+
+TYPEAHEAD_THRESHOLD = 200
+TYPEAHEAD_RESULTS = 50
+OPTION_INDEX_CACHE_SIZE = 32
+
+
+def trigrams(text):
+    return {text[n:n + 3] for n in range(len(text) - 2)}
+
+
+class OptionIndex:
+    def __init__(self, options):
+        self.options = options
+        self.keys = [str(option).lower() for option in options]
+        ordered = sorted((key, n) for n, key in enumerate(self.keys))
+        self.sorted_keys = [key for key, _ in ordered]
+        self.sorted_positions = [n for _, n in ordered]
+        self.postings = {}  # trigram -> option positions, ascending
+        for n, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                self.postings.setdefault(gram, []).append(n)
+
+    def search(self, query, limit=TYPEAHEAD_RESULTS):
+        """Up to limit options matching query: prefix matches first, then other substring matches."""
+        query = query.strip().lower()
+        if not query:
+            return list(self.options[:limit])
+        found = []
+        start = bisect_left(self.sorted_keys, query)
+        for key, n in zip(self.sorted_keys[start:start + limit], self.sorted_positions[start:start + limit]):
+            if not key.startswith(query):
+                break
+            found.append(n)
+        if len(found) < limit and len(query) >= 3:
+            lists = sorted((self.postings.get(gram, []) for gram in trigrams(query)), key=len)
+            if lists[0]:
+                seen = set(found)
+                candidates = set(lists[0]).intersection(*lists[1:])
+                for n in sorted(candidates):
+                    # Trigrams can match out of order, so confirm the substring
+                    if n not in seen and query in self.keys[n]:
+                        found.append(n)
+                        if len(found) >= limit:
+                            break
+        return [self.options[n] for n in found]
+
+
+@st.cache_resource
+def get_option_index_cache():
+    return FrameCache(max_entries=OPTION_INDEX_CACHE_SIZE)
+
+
+def option_index(options, digest=None):
+    """The OptionIndex for an option tuple.
+
+    Keyed by digest, a content hash of the options, when one is given, so
+    the same directory sent in several forms is indexed once; otherwise by
+    the tuple's identity.
+    """
+    return get_option_index_cache().get(options, OptionIndex, key=digest or None)
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Optional, List, Any
+import csv
+import io
+import os
+import threading
+import streamlit as st
+
+# Optional: image thumbnails need Pillow, XLSX previews need openpyxl
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+PREVIEW_WORKERS = int(os.environ.get("CHATBOT_PREVIEW_WORKERS", "2"))
+PREVIEW_CACHE_SIZE = 512
+THUMBNAIL_SIZE = (160, 160)
+PREVIEW_ROWS = 5
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"}
+
+
+@dataclass(frozen=True)
+class Preview:
+    kind: str  # "image", "table" or "none"
+    image: Optional[bytes] = None
+    columns: Optional[List[str]] = None
+    rows: Optional[List[List[Any]]] = None
+
+
+class PreviewCache:
+    """Previews keyed by content hash, shared by every session and built off the script thread."""
+
+    def __init__(self, workers=PREVIEW_WORKERS, max_entries=PREVIEW_CACHE_SIZE):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # sha256 -> Future[Preview]
+        self.lock = threading.Lock()
+
+    def request(self, handle):
+        """Queue preview generation for a spooled attachment; returns immediately."""
+        with self.lock:
+            if handle.sha256 in self.entries:
+                self.entries.move_to_end(handle.sha256)
+                return
+            self.entries[handle.sha256] = self.pool.submit(build_preview, handle.path, handle.name)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get(self, handle):
+        """The finished Preview, or None while it is still being generated."""
+        with self.lock:
+            future = self.entries.get(handle.sha256)
+        if future is None:
+            self.request(handle)
+            return None
+        if not future.done():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return Preview(kind="none")
+
+
+@st.cache_resource
+def get_preview_cache():
+    return PreviewCache()
+
+
+def build_preview(path, name):
+    extension = os.path.splitext(name)[1].lower()
+    if extension in IMAGE_EXTENSIONS and Image is not None:
+        return image_preview(path)
+    if extension == ".csv":
+        return csv_preview(path)
+    if extension in (".xlsx", ".xlsm") and openpyxl is not None:
+        return xlsx_preview(path)
+    return Preview(kind="none")
+
+
+def image_preview(path):
+    with Image.open(path) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="PNG")
+    return Preview(kind="image", image=buffer.getvalue())
+
+
+def csv_preview(path):
+    # Only the header and the first few rows are ever read
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        rows = [row for _, row in zip(range(PREVIEW_ROWS), reader)]
+    # Ragged rows are padded/trimmed to the header so they fit in one table
+    rows = [(row + [""] * len(columns))[:len(columns)] for row in rows]
+    return Preview(kind="table", columns=columns, rows=rows)
+
+
+def xlsx_preview(path):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        values = list(workbook.active.iter_rows(max_row=PREVIEW_ROWS + 1, values_only=True))
+    finally:
+        workbook.close()
+    if not values:
+        return Preview(kind="table", columns=[], rows=[])
+    columns = [str(c) if c is not None else "" for c in values[0]]
+    return Preview(kind="table", columns=columns, rows=[list(row) for row in values[1:]])
@@ -0,0 +1,235 @@
+"""Bounded-memory profiling of uploaded sample-data CSV files.
+
+The file is read once, in chunks of rows; each column keeps only fixed-size
+state (counters, a HyperLogLog sketch for distinct values and a Space-Saving
+summary for the most frequent ones), so memory does not grow with row count.
+Per cell the work is constant: Space-Saving evicts in O(1) and a column only
+runs full type inference when a value does not match its previous type.
+"""
+from datetime import date, datetime
+import csv
+import hashlib
+import math
+import re
+
+CHUNK_ROWS = 10_000
+TOP_K = 10
+NULL_TOKENS = {"", "na", "n/a", "null", "none", "nan"}
+BOOLEAN_TOKENS = {"true", "false", "yes", "no"}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S")
+# Cheap gate in front of strptime: anything that can parse as one of DATE_FORMATS
+DATE_SHAPE = re.compile(r"\d{1,4}[-/]\d{1,2}[-/]\d{1,4}( \d{1,2}:\d{1,2}:\d{1,2})?")
+
+
+class HyperLogLog:
+    """Cardinality estimate in 2**p registers (p=12 -> 4 KiB, ~1.6% error)."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(value.encode("utf-8", "replace"), digest_size=8).digest(), "big")
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            return round(self.m * math.log(self.m / zeros))
+        return round(estimate)
+
+
+class SpaceSaving:
+    """Approximate top-k frequent values using a fixed number of counters.
+
+    Counters are grouped into buckets of equal count (the stream-summary
+    layout). Counts only ever grow by one, so the smallest bucket is tracked
+    directly and both increments and evictions are O(1).
+    """
+
+    def __init__(self, k=TOP_K, capacity_factor=10):
+        self.k = k
+        self.capacity = k * capacity_factor
+        self.counts = {}  # value -> [count, overestimate]
+        self.buckets = {}  # count -> {value: None}, insertion-ordered
+        self.min_count = 0
+
+    def _move(self, value, old, new):
+        """Move value from the bucket of count old to that of count new (0 means none)."""
+        if old:
+            bucket = self.buckets[old]
+            del bucket[value]
+            if not bucket:
+                del self.buckets[old]
+                if self.min_count == old:
+                    self.min_count = old + 1
+        if new:
+            self.buckets.setdefault(new, {})[value] = None
+
+    def add(self, value):
+        entry = self.counts.get(value)
+        if entry is not None:
+            entry[0] += 1
+            self._move(value, entry[0] - 1, entry[0])
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = [1, 0]
+            self._move(value, 0, 1)
+            self.min_count = 1
+        else:
+            # Evict the oldest of the smallest counters; the newcomer inherits its count as possible overestimate
+            floor = self.min_count
+            victim = next(iter(self.buckets[floor]))
+            del self.counts[victim]
+            self.counts[value] = [floor + 1, floor]
+            self._move(victim, floor, 0)
+            self._move(value, 0, floor + 1)
+
+    def top(self):
+        """Top values with their guaranteed minimum counts (count minus overestimate)."""
+        ranked = sorted(((v, c - e) for v, (c, e) in self.counts.items()), key=lambda item: -item[1])
+        return [(value, count) for value, count in ranked[:self.k] if count > 1]
+
+
+def parse_date(value, fmt):
+    if fmt == "%Y-%m-%d" and len(value) == 10 and value[4] == value[7] == "-":
+        date.fromisoformat(value)  # same check as strptime, several times faster
+    else:
+        datetime.strptime(value, fmt)
+
+
+def date_format(value):
+    """The first of DATE_FORMATS that value parses with, or None."""
+    if not DATE_SHAPE.fullmatch(value):
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            parse_date(value, fmt)
+            return fmt
+        except ValueError:
+            pass
+    return None
+
+
+def infer_type(value):
+    return infer_type_and_format(value)[0]
+
+
+def infer_type_and_format(value):
+    """The value's type, plus the date format that matched for dates."""
+    try:
+        int(value)
+        return "integer", None
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return "float", None
+    except ValueError:
+        pass
+    if value.lower() in BOOLEAN_TOKENS:
+        return "boolean", None
+    fmt = date_format(value)
+    if fmt is not None:
+        return "date", fmt
+    return "string", None
+
+
+def matches_settled_type(value, kind, fmt):
+    """Whether value is certainly of the column's previous type, checked with a single parse.
+
+    Only types that cannot be mistaken for an earlier one in infer_type's
+    order qualify; anything else falls back to full inference.
+    """
+    try:
+        if kind == "integer":
+            int(value)
+            return True
+        if kind == "date":
+            parse_date(value, fmt)
+            return True
+    except ValueError:
+        return False
+    return kind == "boolean" and value.lower() in BOOLEAN_TOKENS
+
+
+class ColumnProfile:
+    def __init__(self, name):
+        self.name = name
+        self.nulls = 0
+        self.types = {}
+        self.distinct = HyperLogLog()
+        self.top = SpaceSaving()
+        self.minimum = None
+        self.maximum = None
+        # Type (and date format) of the previous value; most columns never change it
+        self.settled = (None, None)
+
+    def add(self, value):
+        value = value.strip()
+        if value.lower() in NULL_TOKENS:
+            self.nulls += 1
+            return
+        kind, fmt = self.settled
+        if not matches_settled_type(value, kind, fmt):
+            kind, fmt = self.settled = infer_type_and_format(value)
+        self.types[kind] = self.types.get(kind, 0) + 1
+        self.distinct.add(value)
+        self.top.add(value)
+        if kind in ("integer", "float"):
+            number = float(value)
+            self.minimum = number if self.minimum is None else min(self.minimum, number)
+            self.maximum = number if self.maximum is None else max(self.maximum, number)
+
+    def dominant_type(self):
+        if not self.types:
+            return "empty"
+        if set(self.types) <= {"integer", "float"} and "float" in self.types:
+            return "float"
+        return max(self.types, key=self.types.get)
+
+    def summary(self, rows):
+        summary = {
+            "name": self.name,
+            "type": self.dominant_type(),
+            "null_rate": round(self.nulls / rows, 4) if rows else 0.0,
+            "distinct_estimate": self.distinct.count(),
+            "top_values": [[value, count] for value, count in self.top.top()],
+        }
+        if self.minimum is not None:
+            summary["min"] = self.minimum
+            summary["max"] = self.maximum
+        return summary
+
+
+def profile_csv(path, name=None, chunk_rows=CHUNK_ROWS):
+    """Stream a CSV file and return a compact, JSON-serialisable profile."""
+    rows = 0
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = [ColumnProfile(column or f"column_{n}") for n, column in enumerate(header)]
+        while True:
+            chunk = [row for _, row in zip(range(chunk_rows), reader)]
+            if not chunk:
+                break
+            for row in chunk:
+                for column, value in zip(columns, row):
+                    column.add(value)
+                # Short rows count as nulls in the missing columns
+                for column in columns[len(row):]:
+                    column.nulls += 1
+            rows += len(chunk)
+
+    return {
+        "name": name or path,
+        "rows": rows,
+        "columns": [column.summary(rows) for column in columns],
+    }
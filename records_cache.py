@@ -0,0 +1,63 @@
+"""Tables for records messages, built once per message instead of on every rerun."""
+from collections import OrderedDict
+import threading
+import pandas as pd
+import streamlit as st
+
+from records_codec import page_table
+
+FRAME_CACHE_SIZE = 64
+
+# Built once at import; every records table in the apps shares it
+RECORDS_COLUMN_CONFIG = {
+    "Reporting DCID": st.column_config.NumberColumn("Reporting DCID"),
+    "Phase": st.column_config.TextColumn("Phase"),
+    "Data Owner": st.column_config.TextColumn("Data Owner"),
+    "Status Label": st.column_config.TextColumn("Status Label"),
+    "Created Date": st.column_config.DateColumn("Created Date")
+}
+
+
+class FrameCache:
+    """Size-bounded LRU of built tables.
+
+    Entries are keyed by the identity of the source object (the records list
+    held in session state), or by an explicit key for data that is re-created
+    on each run such as pages returned by st.cache_data. The source is kept
+    alongside the table so its id cannot be reused while the entry exists.
+    """
+
+    def __init__(self, max_entries=FRAME_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (source, table)
+        self.lock = threading.Lock()
+
+    def get(self, source, build, key=None):
+        cache_key = ("id", id(source)) if key is None else ("key", key)
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is not None and (key is not None or entry[0] is source):
+                self.entries.move_to_end(cache_key)
+                return entry[1]
+        table = build(source)
+        with self.lock:
+            self.entries[cache_key] = (source, table)
+            self.entries.move_to_end(cache_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return table
+
+
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache()
+
+
+def records_frame(records):
+    """DataFrame for a message's records list, built on first display only."""
+    return get_frame_cache().get(records, pd.DataFrame)
+
+
+def page_frame(page, key):
+    """Table for one records page (Arrow or pandas), keyed by query, cursor and page size."""
+    return get_frame_cache().get(page, page_table, key=key)
@@ -0,0 +1,47 @@
+"""Columnar (Arrow IPC) encoding for records payloads.
+
+pyarrow is optional: without it the apps simply do not advertise the
+"arrow_records" capability and keep receiving JSON rows.
+"""
+import base64
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_AVAILABLE = pa is not None
+
+
+def encode_arrow(rows):
+    """Rows (list of dicts) -> base64 Arrow IPC stream, safe to embed in JSON."""
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+
+
+def decode_arrow(payload):
+    """base64 Arrow IPC stream -> pyarrow.Table, without building per-row Python objects."""
+    buffer = pa.py_buffer(base64.b64decode(payload))
+    return pa.ipc.open_stream(buffer).read_all()
+
+
+def page_table(page):
+    """Table for a records page: the Arrow column block if present, else the JSON rows."""
+    if page.get("rows_arrow") and ARROW_AVAILABLE:
+        return decode_arrow(page["rows_arrow"])
+    return pd.DataFrame(page.get("rows", []))
+
+
+def page_row_count(page):
+    return page.get("row_count", len(page.get("rows", [])))
+
+
+def page_rows(page):
+    """The rows of a records page as a list of dicts, whichever encoding it arrived in."""
+    if page.get("rows_arrow") and ARROW_AVAILABLE:
+        return decode_arrow(page["rows_arrow"]).to_pylist()
+    return page.get("rows", [])
@@ -0,0 +1,82 @@
+"""Local query engine for a records result: filter, sort and group without a backend call.
+
+The engine is built once per records message. Every column becomes a numpy
+array, and the low-cardinality columns get a hash index that maps each value
+to its row positions. Each follow-up ("only Active", "group by Phase", "sort
+by Created Date") is then a few vectorised array operations over data the
+session already holds.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from records_cache import FrameCache
+
+INDEXED_COLUMNS = ("Status Label", "Phase", "Data Owner")
+ENGINE_CACHE_SIZE = 16
+MAX_ENGINE_ROWS = 50_000
+
+
+def column_array(values):
+    """Narrowest numpy array for a column: integers, floats, dates, else strings."""
+    for dtype in ("int64", "float64", "datetime64[D]"):
+        try:
+            return np.array(values, dtype=dtype)
+        except (TypeError, ValueError):
+            pass
+    return np.array(["" if v is None else str(v) for v in values])
+
+
+class RecordsEngine:
+    def __init__(self, rows, indexed=INDEXED_COLUMNS):
+        rows = rows[:MAX_ENGINE_ROWS]
+        self.size = len(rows)
+        self.columns = list(rows[0].keys()) if rows else []
+        self.arrays = {name: column_array([row.get(name) for row in rows]) for name in self.columns}
+        # value -> sorted row positions, one dict per indexed column
+        self.indexes = {}
+        for name in indexed:
+            if name not in self.arrays:
+                continue
+            values, inverse = np.unique(self.arrays[name], return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(values)))[:-1]
+            self.indexes[name] = dict(zip(values.tolist(), np.split(order, bounds)))
+
+    def values(self, column):
+        return list(self.indexes[column])
+
+    def filter(self, selections):
+        """Row positions matching every {column: allowed values} selection (empty selections are ignored)."""
+        positions = None
+        for column, allowed in selections.items():
+            if not allowed:
+                continue
+            index = self.indexes[column]
+            hits = [index[value] for value in allowed if value in index]
+            matched = np.sort(np.concatenate(hits)) if hits else np.empty(0, dtype=np.intp)
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return np.arange(self.size) if positions is None else positions
+
+    def sort(self, positions, column, descending=False):
+        order = np.argsort(self.arrays[column][positions], kind="stable")
+        return positions[order[::-1] if descending else order]
+
+    def group_by(self, positions, column):
+        """Record count per value of column, largest group first."""
+        values, counts = np.unique(self.arrays[column][positions], return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return pd.DataFrame({column: values[order], "Records": counts[order]})
+
+    def frame(self, positions):
+        return pd.DataFrame({name: array[positions] for name, array in self.arrays.items()})
+
+
+@st.cache_resource
+def get_engine_cache():
+    return FrameCache(max_entries=ENGINE_CACHE_SIZE)
+
+
+def records_engine(source, load_rows, key=None):
+    """The RecordsEngine for a records message, built from load_rows(source) on first use only."""
+    return get_engine_cache().get(source, lambda s: RecordsEngine(load_rows(s)), key=key)
@@ -0,0 +1,73 @@
+from typing import List, Optional, Any
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class BotMessage(BaseModel):
+    main_text: Optional[str] = None
+    buttons: Optional[List[str]] = None
+    text_area: Optional[str] = None
+    text_field: Optional[str] = None
+    data: Optional[Any] = None
+    timestamp: datetime = Field(default_factory=datetime.now)
+    enable_text: Optional[bool] = False
+    enable_text_area: Optional[bool] = False
+    enable_calender: Optional[bool] = False
+    enable_attachment: Optional[bool] = False
+    enable_records: Optional[bool] = False
+    records_clickable: Optional[bool] = False
+    enable_filter: Optional[bool] = False
+    filter_data: Optional[List[str]] = None
+    enable_form: Optional[bool] = False
+
+
+class DCIDForm(BaseModel):
+    data_concern : str = None 
+    source : str = None
+    detected_csi_application: Optional[List[str]] = None
+    euc: Optional[str] = None
+    impacted_business_process : Optional[List[str]] = None
+    impacted_data_elements: Optional[List[str]] = None
+    frequency : str = None
+    detected_date: datetime = None
+    sample_data_attachements : Optional[List[str]] = []
+    primary_contact: str = None
+    on_behalf_of: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    user_id: str
+    sender: str
+    state: str
+    messages: List[BotMessage] = []
+    callable: Optional[bool] = False
+
+
+class HumanMessage(BaseModel):
+    main_text: Optional[str] = None
+    files: Optional[List[str]] = None
+    data: Optional[Any] = None
+    timestamp: Optional[str] = None
+
+
+class ChatRequest(BaseModel):
+    session_id: str
+    user_id: str
+    sender: str = "user"
+    state: str
+    messages: Optional[HumanMessage] = None
+    # Optional protocol features the UI understands, e.g. "paged_records"
+    capabilities: List[str] = []
+
+
+class RecordsPage(BaseModel):
+    """One page of an enable_records result; next_cursor is None on the last page."""
+    query_id: str
+    total: int
+    page_size: int
+    rows: List[Any] = []
+    # Same rows as a base64 Arrow IPC stream when the client asked for "arrow_records"
+    rows_arrow: Optional[str] = None
+    row_count: int = 0
+    next_cursor: Optional[str] = None
@@ -0,0 +1,38 @@
+"""Incremental inverted index behind the conversation search box.
+
+Documents are (message_index, field, row) tuples, with row -1 for anything
+that is not a records row. Each token maps to the set of documents it occurs
+in. Documents are added as messages arrive, so a query only intersects a few
+posting sets and never rescans the history.
+"""
+import heapq
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_RESULTS = 20
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = {}  # token -> set of documents
+        self.indexed_upto = 0  # history entries below this index are already indexed
+        self.awaiting_text = set()  # text-area messages whose submitted text is not in yet
+
+    def add(self, doc, text):
+        for token in set(tokenize(text)):
+            self.postings.setdefault(token, set()).add(doc)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Documents containing every token of query, most recent message first."""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        candidates = sorted((self.postings.get(token, set()) for token in tokens), key=len)
+        if not candidates[0]:
+            return []
+        hits = candidates[0].intersection(*candidates[1:])
+        return heapq.nlargest(limit, hits)
@@ -4,10 +4,9 @@ import streamlit as st
 
 import streamlit.components.v1 as components
 
-import requests
+from backend_client import USE_BACKEND, backend_process_state, backend_start_chat
 from datetime import datetime
 
-BASE_URL = "http://localhost:8000"
 g_user_id = "temp"
 
 
@@ -24,26 +23,8 @@ def load_css():
 
 
 def process_state(human_prompt = None , files = None , data = None ):
-    # chat_request = {
-    #     "session_id" : st.session_state.session_id,
-    #     "user_id"    : st.session_state.user_id,
-    #     "sender"     : "user",
-    #     "state"      : st.session_state.state,
-    # }
-    # if not human_prompt: 
-    #     chat_request["messages"] = {
-    #         "main_text" : human_prompt,
-    #         "files"     : files,
-    #         "data"      : data,
-    #         "timestamp" : str(datetime.now())
-    #     }
-    
-    # response = requests.post(f"{BASE_URL}/process_state", json= chat_request)
-    # if response.status_code == 200: 
-    #     st.session_state.state = response["state"]
-    #     return response.json()
-    # else: 
-    #     return "Error processing request"
+    if USE_BACKEND:
+        return backend_process_state(human_prompt, files, data)
     response = {'session_id' : "TEMP_SESSION" , 'user_id' : 'temp' , 'sender' : 'bot' , 'state' : 'INITIAL_RESP' , 
                 'messages' : [{'main_text' : 'Hello How can I assit you' , 'buttons': ['check the status' , 'submit a concern'] , 
                                'text_area': None , 'text_field': None , 'data' : None , 'time_stamp': datetime.now() , 'enable_text': False, 
@@ -53,20 +34,20 @@ def process_state(human_prompt = None , files = None , data = None ):
 
 
 def start_chat(user_id):
-    # response = requests.post(f"{BASE_URL}/start_chat", params= {"user_id": user_id})
-    # if response.status_code == 200:
-    #     response = response.json()
-    #     st.session_state.session_id = response["session_id"]
-    #     st.session_state.state = response["state"]
-    #     st.success("Chat started successfully!")
-    # else:
-    #     st.error("Failed to start chat.")
+    if USE_BACKEND:
+        if backend_start_chat(user_id) is not None:
+            st.success("Chat started successfully!")
+        return
     st.session_state.session_id = "TEMP_SESSION"
     st.session_state.state = "INITIAL"
 
 def initialize_session_state():
     if "session_id" not in st.session_state:
         start_chat(g_user_id)
+        if "session_id" not in st.session_state:
+            # The backend could not be reached (already reported); any rerun tries again
+            st.button("Retry")
+            st.stop()
     if "history" not in st.session_state:
         st.session_state.history = []
     # if "token_count" not in st.session_state:
@@ -130,6 +111,9 @@ def on_click_callback():
     #     human_prompt
     # )
     bot_response = process_state(human_prompt=human_prompt)
+    if bot_response is None:
+        # Backend unreachable; the error is shown and the prompt stays for a retry
+        return
 
     st.session_state.history.append(
         Message("human", human_prompt)
@@ -1,37 +1,16 @@
 from dataclasses import dataclass
+from functools import partial
 from typing import Literal, List, Optional, Any
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
+from attachments import spool_upload
+from records_cache import RECORDS_COLUMN_CONFIG, records_frame
+from backend_client import USE_BACKEND, backend_process_state, backend_start_chat
 from datetime import datetime
-from pydantic import BaseModel, Field
-import pandas as pd
+from schemas import ChatResponse
 
-BASE_URL = "http://localhost:8000"
 g_user_id = "temp"
 
-class BotMessage(BaseModel):
-    main_text: Optional[str] = None
-    buttons: Optional[List[str]] = None
-    text_area: Optional[str] = None
-    text_field: Optional[str] = None
-    data: Optional[Any] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
-    enable_text: Optional[bool] = False
-    enable_text_area: Optional[bool] = False
-    enable_calender: Optional[bool] = False
-    enable_attachment: Optional[bool] = False
-    enable_records : Optional[bool] = False
-    records_clickable : Optional[bool] = False
-
-class ChatResponse(BaseModel):
-    session_id: str
-    user_id: str
-    sender: str
-    state: str
-    messages: List[BotMessage] = []
-    callable: Optional[bool] = False
-
 @dataclass
 class Message:
     """Class for keeping track of a chat message."""
@@ -54,6 +33,9 @@ def load_css():
 
 
 def process_state(human_prompt=None, files=None, data=None):
+    if USE_BACKEND:
+        return backend_process_state(human_prompt, files, data)
+
     # Example response with records data
     if human_prompt and "show records" in human_prompt.lower():
         # Mock records data
@@ -121,12 +103,21 @@ def process_state(human_prompt=None, files=None, data=None):
 
 
 
-def start_chat(user_id):    
+def start_chat(user_id):
+    if USE_BACKEND:
+        backend_start_chat(user_id)
+        return
     st.session_state.session_id = "TEMP_SESSION"
     st.session_state.state = "INITIAL"
 
 
 def initialize_session_state():
+    if USE_BACKEND and "session_id" not in st.session_state:
+        start_chat(g_user_id)
+        if "session_id" not in st.session_state:
+            # The backend could not be reached (already reported); any rerun tries again
+            st.button("Retry")
+            st.stop()
     required_states = {
         "session_id": g_user_id,
         "state": "INITIAL",
@@ -143,6 +134,11 @@ def initialize_session_state():
             st.session_state[key] = value
 
 def on_button_click(button_text, message_index):
+    # Ask the backend first: on failure (None, already reported) nothing has changed and the buttons stay live
+    response = process_state(button_text)
+    if response is None:
+        return
+
     # Disable buttons for this message
     st.session_state.history[message_index].buttons_disabled = True
     st.session_state.last_interaction_index = message_index
@@ -150,15 +146,16 @@ def on_button_click(button_text, message_index):
     # Add user's selection to history
     st.session_state.history.append(Message("human", f"{button_text}"))
     
-    # Process response
-    response = process_state(button_text)
     handle_bot_response(response)
 
 def on_text_submit(message_index):
     if st.session_state.user_input:
+        response = process_state(st.session_state.user_input)
+        if response is None:
+            # Keep the typed text so it can be sent again
+            return
         st.session_state.last_interaction_index = message_index
         st.session_state.history.append(Message("human", st.session_state.user_input))
-        response = process_state(st.session_state.user_input)
         handle_bot_response(response)
         st.session_state.user_input = ""
         
@@ -168,6 +165,9 @@ def on_date_next_click(index):
     date_key = f"date_{index}"
     if st.session_state.get(date_key):
         selected_date = st.session_state[date_key]
+        response = process_state(data={"date": str(selected_date)})
+        if response is None:
+            return
         st.session_state[f"submitted_date_{index}"] = selected_date
         st.session_state.history[index].enable_calender = False
         st.session_state.last_interaction_index = index
@@ -175,7 +175,6 @@ def on_date_next_click(index):
         st.session_state.history.append(
             Message("human", f"Selected date: {selected_date}")
         )
-        response = process_state(data={"date": str(selected_date)})
         handle_bot_response(response)
     else:
         st.error("Please select a date")
@@ -189,6 +188,9 @@ def on_text_area_submit():
     if last_text_area_index is not None:
         text_input = st.session_state.get(f"text_area_{last_text_area_index}")
         if text_input:
+            response = process_state(text_input)
+            if response is None:
+                return
             st.session_state[f"submitted_text_{last_text_area_index}"] = text_input
             st.session_state.history[last_text_area_index].enable_text_area = False
             st.session_state.last_interaction_index = last_text_area_index
@@ -196,23 +198,26 @@ def on_text_area_submit():
             st.session_state.history.append(
                 Message("human", f"Submitted: {text_input}")
             )
-            response = process_state(text_input)
             handle_bot_response(response)
 
 
 def on_file_upload(message_index):
     files_key = f"files_{message_index}"
     submitted_key = f"files_submitted_{message_index}"
-    st.session_state.last_interaction_index = message_index
     
     if st.session_state.get(files_key):
-        # Store uploaded files in separate session state
-        st.session_state[submitted_key] = st.session_state[files_key]
+        # Spool uploads to disk; session state only keeps name/size/hash handles
+        handles = [spool_upload(file) for file in st.session_state[files_key]]
+        file_names = [handle.name for handle in handles]
+        response = process_state(files=file_names)
+        if response is None:
+            # The uploader stays live so the files can be sent again
+            return
+        st.session_state[submitted_key] = handles
+        st.session_state.last_interaction_index = message_index
         
         # Process files and update chat
-        file_names = [file.name for file in st.session_state[submitted_key]]
         st.session_state.history.append(Message("human", f"Uploaded files: {', '.join(file_names)}"))
-        response = process_state(files=file_names)
         handle_bot_response(response)
         
         # Set a flag to indicate files have been processed
@@ -223,7 +228,13 @@ def on_file_upload(message_index):
 
 
 def on_row_click(message_index, record_data):
-    """Handles the click action on a record row's 'Select' button."""
+    """Handles the selection of a record row."""
+    # Call process_state first, passing the selected record data as the 'data' parameter;
+    # on failure (None, already reported) the records stay clickable
+    response = process_state(data=record_data)
+    if response is None:
+        return
+
     # 1. Disable the clickable records view for this *specific* AI message
     st.session_state.history[message_index].records_clickable = False
     st.session_state.last_interaction_index = message_index
@@ -233,17 +244,25 @@ def on_row_click(message_index, record_data):
     user_message_text = f"Selected record: {record_data}"
     st.session_state.history.append(Message(origin="human", message=user_message_text))
 
-    # 3. Call process_state, passing the selected record data
-    #    Pass the dict directly using the 'data' parameter
-    response = process_state(data=record_data)
-
-    # 4. Handle the bot's response
+    # 3. Handle the bot's response (the rerun that follows every callback redraws the view)
     handle_bot_response(response)
-    st.rerun() # Rerun to update the display and disable the clicked records view
+
+
+def on_record_select(message_index):
+    """Selection-event callback of a clickable records table."""
+    selection = st.session_state[f"records_select_{message_index}"].selection
+    if not selection.rows:
+        return
+    record = st.session_state.history[message_index].records_data[selection.rows[0]]
+    on_row_click(message_index, record)
 
 
 def handle_bot_response(response):
-    if 'messages' in response:
+    # None means the backend call failed and the error has already been shown
+    if response:
+        # Normalise through the shared contract, so inline mock and backend replies have one shape
+        response = ChatResponse.model_validate(response).model_dump()
+    if response and 'messages' in response:
         for msg in response['messages']:
                 
             records = msg.get('data') if msg.get('enable_records') else None
@@ -274,6 +293,10 @@ def main():
 
     if not st.session_state.first_message_sent:
         response = process_state()
+        if response is None:
+            # Nothing to show yet; any rerun (e.g. this button) asks for the greeting again
+            st.button("Retry")
+            return
         handle_bot_response(response)
         st.session_state.first_message_sent = True
 
@@ -370,37 +393,26 @@ def main():
 
 
                 if chat.enable_records and chat.records_data :
-                    st.markdown("---") # Separator
-                    # Adjust the widths as needed
-                    col_keys = list(chat.records_data[0].keys()) if chat.records_data else []
-                    col_widths = [2] * len(col_keys) + [1] # Example: Equal width for data, smaller for button
-                    cols = st.columns(col_widths)
-
-                    # Display Headers
-                    for k, header_text in enumerate(col_keys):
-                         cols[k].markdown(f"<span class='record-header'>{header_text}</span>", unsafe_allow_html=True)
-                    
+                    # One table widget however many rows there are; in clickable mode
+                    # a row selection is routed to on_row_click through on_record_select
                     if chat.records_clickable:
-                        cols[-1].markdown("<span class='record-header'>Action</span>", unsafe_allow_html=True) # Header for button column
-
-                    # Display Data Rows
-                    for row_idx, record in enumerate(chat.records_data):
-                         # Use a container for visual grouping of the row
-                        with st.container():
-                            row_cols = st.columns(col_widths)
-                            for k, key in enumerate(col_keys):
-                                row_cols[k].write(record.get(key, "N/A")) # Display data in respective columns
-                            # Add the 'Select' button in the last column
-                            if chat.records_clickable:
-                                row_cols[-1].button(
-                                    "Select",
-                                    key=f"record_{i}_{row_idx}", # Unique key: msg index + row index
-                                    on_click=on_row_click,
-                                    args=(i, record) # Pass message index and the row's data
-                                )
-                        # Add a subtle divider between rows (optional)
-                        # st.markdown("<hr style='margin: 2px 0;'>", unsafe_allow_html=True)
-                    st.markdown("---") # Separator
+                        st.caption("Select a row to choose that record.")
+                        st.dataframe(
+                            records_frame(chat.records_data),
+                            column_config=RECORDS_COLUMN_CONFIG,
+                            use_container_width=True,
+                            hide_index=True,
+                            key=f"records_select_{i}",
+                            on_select=partial(on_record_select, i),
+                            selection_mode="single-row"
+                        )
+                    else:
+                        st.dataframe(
+                            records_frame(chat.records_data),
+                            column_config=RECORDS_COLUMN_CONFIG,
+                            use_container_width=True,
+                            hide_index=True
+                        )
 
                 # Show submitted content
                 if f"submitted_text_{i}" in st.session_state:
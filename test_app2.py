@@ -2,35 +2,14 @@ from dataclasses import dataclass
 from typing import Literal, List, Optional, Any
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
+from attachments import spool_upload
+from records_cache import RECORDS_COLUMN_CONFIG, records_frame
+from backend_client import USE_BACKEND, backend_process_state, backend_start_chat
 from datetime import datetime
-from pydantic import BaseModel, Field
-import pandas as pd
+from schemas import ChatResponse
 
-BASE_URL = "http://localhost:8000"
 g_user_id = "temp"
 
-class BotMessage(BaseModel):
-    main_text: Optional[str] = None
-    buttons: Optional[List[str]] = None
-    text_area: Optional[str] = None
-    text_field: Optional[str] = None
-    data: Optional[Any] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
-    enable_text: Optional[bool] = False
-    enable_text_area: Optional[bool] = False
-    enable_calender: Optional[bool] = False
-    enable_attachment: Optional[bool] = False
-    enable_records : Optional[bool] = False
-
-class ChatResponse(BaseModel):
-    session_id: str
-    user_id: str
-    sender: str
-    state: str
-    messages: List[BotMessage] = []
-    callable: Optional[bool] = False
-
 @dataclass
 class Message:
     """Class for keeping track of a chat message."""
@@ -77,6 +56,9 @@ def load_css():
 #     return response
 
 def process_state(human_prompt=None, files=None, data=None):
+    if USE_BACKEND:
+        return backend_process_state(human_prompt, files, data)
+
     # Example response with records data
     if human_prompt and "show records" in human_prompt.lower():
         # Mock records data
@@ -143,21 +125,20 @@ def process_state(human_prompt=None, files=None, data=None):
 
 
 def start_chat(user_id):
-    # Actual implementation would call the backend
-    # response = requests.post(f"{BASE_URL}/start_chat", params={"user_id": user_id})
-    # if response.status_code == 200:
-    #     response = response.json()
-    #     st.session_state.session_id = response["session_id"]
-    #     st.session_state.state = response["state"]
-    #     st.success("Chat started successfully!")
-    # else:
-    #     st.error("Failed to start chat.")
-    
+    if USE_BACKEND:
+        backend_start_chat(user_id)
+        return
     st.session_state.session_id = "TEMP_SESSION"
     st.session_state.state = "INITIAL"
 
 
 def initialize_session_state():
+    if USE_BACKEND and "session_id" not in st.session_state:
+        start_chat(g_user_id)
+        if "session_id" not in st.session_state:
+            # The backend could not be reached (already reported); any rerun tries again
+            st.button("Retry")
+            st.stop()
     required_states = {
         "session_id": g_user_id,
         "state": "INITIAL",
@@ -174,6 +155,11 @@ def initialize_session_state():
             st.session_state[key] = value
 
 def on_button_click(button_text, message_index):
+    # Ask the backend first: on failure (None, already reported) nothing has changed and the buttons stay live
+    response = process_state(button_text)
+    if response is None:
+        return
+
     # Disable buttons for this message
     st.session_state.history[message_index].buttons_disabled = True
     st.session_state.last_interaction_index = message_index
@@ -181,15 +167,16 @@ def on_button_click(button_text, message_index):
     # Add user's selection to history
     st.session_state.history.append(Message("human", f"{button_text}"))
     
-    # Process response
-    response = process_state(button_text)
     handle_bot_response(response)
 
 def on_text_submit(message_index):
     if st.session_state.user_input:
+        response = process_state(st.session_state.user_input)
+        if response is None:
+            # Keep the typed text so it can be sent again
+            return
         st.session_state.last_interaction_index = message_index
         st.session_state.history.append(Message("human", st.session_state.user_input))
-        response = process_state(st.session_state.user_input)
         handle_bot_response(response)
         st.session_state.user_input = ""
         
@@ -199,6 +186,9 @@ def on_date_next_click(index):
     date_key = f"date_{index}"
     if st.session_state.get(date_key):
         selected_date = st.session_state[date_key]
+        response = process_state(data={"date": str(selected_date)})
+        if response is None:
+            return
         st.session_state[f"submitted_date_{index}"] = selected_date
         st.session_state.history[index].enable_calender = False
         st.session_state.last_interaction_index = index
@@ -206,7 +196,6 @@ def on_date_next_click(index):
         st.session_state.history.append(
             Message("human", f"Selected date: {selected_date}")
         )
-        response = process_state(data={"date": str(selected_date)})
         handle_bot_response(response)
     else:
         st.error("Please select a date")
@@ -220,6 +209,9 @@ def on_text_area_submit():
     if last_text_area_index is not None:
         text_input = st.session_state.get(f"text_area_{last_text_area_index}")
         if text_input:
+            response = process_state(text_input)
+            if response is None:
+                return
             st.session_state[f"submitted_text_{last_text_area_index}"] = text_input
             st.session_state.history[last_text_area_index].enable_text_area = False
             st.session_state.last_interaction_index = last_text_area_index
@@ -227,7 +219,6 @@ def on_text_area_submit():
             st.session_state.history.append(
                 Message("human", f"Submitted: {text_input}")
             )
-            response = process_state(text_input)
             handle_bot_response(response)
 
 
@@ -246,16 +237,20 @@ def on_file_upload(message_index):
     #     st.session_state.uploaded_files = None
     files_key = f"files_{message_index}"
     submitted_key = f"files_submitted_{message_index}"
-    st.session_state.last_interaction_index = message_index
     
     if st.session_state.get(files_key):
-        # Store uploaded files in separate session state
-        st.session_state[submitted_key] = st.session_state[files_key]
+        # Spool uploads to disk; session state only keeps name/size/hash handles
+        handles = [spool_upload(file) for file in st.session_state[files_key]]
+        file_names = [handle.name for handle in handles]
+        response = process_state(files=file_names)
+        if response is None:
+            # The uploader stays live so the files can be sent again
+            return
+        st.session_state[submitted_key] = handles
+        st.session_state.last_interaction_index = message_index
         
         # Process files and update chat
-        file_names = [file.name for file in st.session_state[submitted_key]]
         st.session_state.history.append(Message("human", f"Uploaded files: {', '.join(file_names)}"))
-        response = process_state(files=file_names)
         handle_bot_response(response)
         
         # Set a flag to indicate files have been processed
@@ -265,7 +260,11 @@ def on_file_upload(message_index):
         st.error("Please upload files first.")
 
 def handle_bot_response(response):
-    if 'messages' in response:
+    # None means the backend call failed and the error has already been shown
+    if response:
+        # Normalise through the shared contract, so inline mock and backend replies have one shape
+        response = ChatResponse.model_validate(response).model_dump()
+    if response and 'messages' in response:
         for msg in response['messages']:
             bot_message = Message(
                 origin="ai",
@@ -287,6 +286,10 @@ def main():
 
     if not st.session_state.first_message_sent:
         response = process_state()
+        if response is None:
+            # Nothing to show yet; any rerun (e.g. this button) asks for the greeting again
+            st.button("Retry")
+            return
         handle_bot_response(response)
         st.session_state.first_message_sent = True
 
@@ -365,18 +368,9 @@ def main():
                 if chat.enable_records and chat.records_data:
                     st.subheader("Records Data")
 
-                    records_df = pd.DataFrame(chat.records_data)
-                    
-                    # Display as a styled table
                     st.dataframe(
-                        records_df,
-                        column_config={
-                            "Reporting DCID": st.column_config.NumberColumn("Reporting DCID"),
-                            "Phase": st.column_config.TextColumn("Phase"),
-                            "Data Owner": st.column_config.TextColumn("Data Owner"),
-                            "Status Label": st.column_config.TextColumn("Status Label"),
-                            "Created Date": st.column_config.DateColumn("Created Date")
-                        },
+                        records_frame(chat.records_data),
+                        column_config=RECORDS_COLUMN_CONFIG,
                         use_container_width=True,
                         hide_index=True
                     )
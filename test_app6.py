@@ -1,52 +1,51 @@
 from dataclasses import dataclass, field
+import copy
+from types import MappingProxyType
 from typing import Literal, List, Optional, Any, Dict
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
+from attachments import spool_upload
+from previews import get_preview_cache
+from profiler import profile_csv
+from records_codec import ARROW_AVAILABLE, page_row_count, page_rows
+from records_cache import RECORDS_COLUMN_CONFIG, records_frame, page_frame
+from records_engine import MAX_ENGINE_ROWS, records_engine
+from search_index import SearchIndex
+from form_schema import ATTACHMENTS, DATE, MULTISELECT, SELECT, TEXT_AREA, compile_form
+from option_index import TYPEAHEAD_THRESHOLD, option_index
+from drafts import form_identity, get_draft_store
+from backend_client import (USE_BACKEND, STREAM_RESPONSES, backend_process_state, backend_stream_process_state,
+                            backend_start_chat, backend_upload_attachments, backend_fetch_records_page)
 from datetime import datetime
-from pydantic import BaseModel, Field
+from schemas import ChatResponse
 import pandas as pd
+import uuid
+from requests import RequestException
 
-BASE_URL = "http://localhost:8000"
 g_user_id = "temp"
 
-class BotMessage(BaseModel):
-    main_text: Optional[str] = None
-    buttons: Optional[List[str]] = None
-    text_area: Optional[str] = None
-    text_field: Optional[str] = None
-    data: Optional[Any] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
-    enable_text: Optional[bool] = False
-    enable_text_area: Optional[bool] = False
-    enable_calender: Optional[bool] = False
-    enable_attachment: Optional[bool] = False
-    enable_records: Optional[bool] = False
-    enable_filter: Optional[bool] = False
-    filter_data: Optional[List[str]] = None
-
-
-class DCIDForm(BaseModel):
-    data_concern : str = None 
-    source : str = None
-    detected_csi_application: Optional[List[str]] = None
-    euc: Optional[str] = None
-    impacted_business_process : Optional[List[str]] = None
-    impacted_data_elements: Optional[List[str]] = None
-    frequency : str = None
-    detected_date: datetime = None
-    sample_data_attachements : Optional[List[str]] = []
-    primary_contact: str = None
-    on_behalf_of: Optional[str] = None
-
-
-class ChatResponse(BaseModel):
-    session_id: str
-    user_id: str
-    sender: str
-    state: str
-    messages: List[BotMessage] = []
-    callable: Optional[bool] = False
+# Only the last HISTORY_WINDOW messages render live; older ones load in pages on demand
+HISTORY_WINDOW = 40
+EARLIER_PAGE_SIZE = 20
+
+# Records results arrive a page at a time; the mock below serves this many rows
+RECORDS_PAGE_SIZE = 50
+# Page size used when pulling a whole result into the local records engine
+ENGINE_PAGE_SIZE = 1000
+MOCK_RECORDS_TOTAL = 2000
+
+MOCK_RECORDS = [
+    {"Reporting DCID": 12345, "Phase": "Planning", "Data Owner": "John Doe", 
+     "Status Label": "Active", "Created Date": "2024-03-01"},
+    {"Reporting DCID": 12346, "Phase": "Execution", "Data Owner": "Jane Smith", 
+     "Status Label": "Pending", "Created Date": "2024-03-02"},
+    {"Reporting DCID": 12347, "Phase": "Review", "Data Owner": "Bob Johnson", 
+     "Status Label": "Completed", "Created Date": "2024-03-03"},
+    {"Reporting DCID": 12348, "Phase": "Closed", "Data Owner": "Alice Brown", 
+     "Status Label": "Archived", "Created Date": "2024-03-04"},
+    {"Reporting DCID": 12349, "Phase": "Planning", "Data Owner": "Charlie Green", 
+     "Status Label": "Active", "Created Date": "2024-03-05"}
+]
 
 # @dataclass
 # class Message:
@@ -66,9 +65,45 @@ class ChatResponse(BaseModel):
 #     filter_selections: List[str] = field(default_factory=list)
 #     filter_submitted: bool = False
 
-@dataclass
+@dataclass(slots=True)
+class MessagePayload:
+    """Heavy per-message data, kept out of Message in st.session_state.payloads[index]."""
+    records_data: Optional[Any] = None
+    filter_data: Optional[Any] = None
+    filter_selections: List[str] = field(default_factory=list)
+    form_data: Optional[Dict] = None
+    mandatory_fields: Optional[Dict] = None
+    editable_fields: Optional[Dict] = None
+    filter_config: Optional[Dict] = None
+    # The four form config dicts above, compiled once into field descriptors
+    form_schema: Optional[Any] = None
+    # Server's form version when it accepts delta submissions, else None
+    form_version: Optional[int] = None
+    # Cursor for each records page discovered so far (page 0 starts at None)
+    records_cursors: List[Optional[str]] = field(default_factory=lambda: [None])
+
+
+def _payload_field(name, default=lambda: None):
+    """Property that proxies a MessagePayload field from the side table by message index."""
+    def getter(self):
+        payload = st.session_state.payloads.get(self.index)
+        return getattr(payload, name) if payload is not None else default()
+
+    def setter(self, value):
+        payload = st.session_state.payloads.setdefault(self.index, MessagePayload())
+        setattr(payload, name, value)
+
+    return property(getter, setter)
+
+
+@dataclass(slots=True)
 class Message:
-    """Class for keeping track of a chat message."""
+    """Class for keeping track of a chat message.
+
+    Only the small, always-present fields live on the (slotted) message; the
+    records/filter/form payloads sit in a side table keyed by the message's
+    index in history, so plain human and AI turns carry no per-field overhead.
+    """
     origin: Literal["human", "ai"]
     message: str
     buttons: Optional[List[str]] = None
@@ -78,17 +113,73 @@ class Message:
     enable_attachment: bool = False
     buttons_disabled: bool = False
     enable_records: bool = False
-    records_data: Optional[Any] = None
     enable_filter: bool = False
-    filter_data: List[str] = field(default_factory=list)
-    filter_selections: List[str] = field(default_factory=list)
     filter_submitted: bool = False
-    # New form-related fields
     enable_form: bool = False
-    form_data: Optional[Dict] = None
-    mandatory_fields: Optional[Dict] = None
-    editable_fields: Optional[Dict] = None
-    filter_config: Optional[Dict] = None
+    # Position in st.session_state.history, set by append_message
+    index: int = -1
+    # Cached bubble HTML, filled on first render
+    html: Optional[str] = None
+
+    records_data = _payload_field("records_data")
+    filter_data = _payload_field("filter_data", list)
+    filter_selections = _payload_field("filter_selections", list)
+    form_data = _payload_field("form_data")
+    mandatory_fields = _payload_field("mandatory_fields")
+    editable_fields = _payload_field("editable_fields")
+    filter_config = _payload_field("filter_config")
+    form_schema = _payload_field("form_schema")
+    form_version = _payload_field("form_version")
+    records_cursors = _payload_field("records_cursors", lambda: [None])
+
+
+def append_message(message, payload=None):
+    """Append a message to history and register its payload under the new index."""
+    message.index = len(st.session_state.history)
+    if payload is not None:
+        st.session_state.payloads[message.index] = payload
+    st.session_state.history.append(message)
+    return message
+
+def bubble_html(origin, text):
+    # Kept on one line so several bubbles can share a single st.markdown call
+    is_human = origin == "human"
+    return (
+        f'<div class="chat-row {"row-reverse" if is_human else ""}">'
+        f'<img class="chat-icon" src="static/{"user_icon.png" if is_human else "ai_icon.png"}" width=32 height=32>'
+        f'<div class="chat-bubble {"human-bubble" if is_human else "ai-bubble"}">&#8203;{text}</div>'
+        '</div>'
+    )
+
+def message_html(chat):
+    """Bubble HTML for a message, rendered once and cached on the message."""
+    if chat.html is None:
+        chat.html = bubble_html(chat.origin, chat.message)
+    return chat.html
+
+def has_live_elements(i, chat):
+    """True if message i still renders anything besides its bubble (widgets, tables, status)."""
+    if chat.origin != "ai":
+        return False
+    pending = i > st.session_state.last_interaction_index
+    return bool(
+        (chat.buttons and not chat.buttons_disabled and pending)
+        or (chat.enable_calender and pending)
+        or (chat.enable_attachment and pending)
+        or (chat.enable_text_area and pending)
+        or (chat.enable_form and pending)
+        or (chat.enable_records and chat.records_data)
+        or (chat.enable_filter and chat.filter_data)
+        or message_value("submitted_date", i) is not None
+        or message_value("submitted_text", i) is not None
+        or bool(message_value("files_submitted", i))
+    )
+
+def flush_static_bubbles(bubbles):
+    """Emit a run of finished bubbles as one markdown element."""
+    if bubbles:
+        st.markdown("\n".join(bubbles), unsafe_allow_html=True)
+        bubbles.clear()
 
 def load_css():
     with open("static/styles.css", "r") as f:
@@ -96,6 +187,9 @@ def load_css():
         st.markdown(css, unsafe_allow_html=True)
 
 def process_state(human_prompt=None, files=None, data=None):
+    if USE_BACKEND:
+        return backend_process_state(human_prompt, files, data)
+
     # Default response if no specific condition is met
     default_response = {
         'session_id': "TEMP_SESSION",
@@ -121,6 +215,31 @@ def process_state(human_prompt=None, files=None, data=None):
         ]
     }
 
+    if human_prompt and "show records" in human_prompt.lower():
+        response = {
+            'session_id': "TEMP_SESSION",
+            'user_id': 'temp',
+            'sender': 'bot',
+            'state': 'RECORDS_RESP',
+            'messages': [{
+                'main_text': 'Here are the records you requested:',
+                'buttons': [],
+                'text_area': None,
+                'text_field': None,
+                # First page plus a cursor; later pages are fetched on demand
+                'data': mock_records_page("all", None, RECORDS_PAGE_SIZE),
+                'timestamp': datetime.now(),
+                'enable_text': True,
+                'enable_text_area': False,
+                'enable_calender': False,
+                'enable_attachment': False,
+                'enable_records': True,
+                'enable_filter': False,
+                'enable_form': False
+            }]
+        }
+        return response
+
     if human_prompt and "show form" in human_prompt.lower():
         # Your form data and metadata
         sample_data = {
@@ -206,7 +325,8 @@ def process_state(human_prompt=None, files=None, data=None):
                     'mandatory_fields' : mandatory_config, # these the fields that should have some value and cannot be empty , True means mandatory , False means Optional
                     'editable_fields': editable_config, # These fields show if the config is editable or not , if True its Editable , if not its not editable
                     'filter_data' : filter_data, #  This is used to filter data , when None , then filter should not be applied , when a list of values is given then filter option should be given to the user
-                    'filter_config' : filter_config # From the above filter option, it will give the option to either select a single option or select multipl options
+                    'filter_config' : filter_config, # From the above filter option, it will give the option to either select a single option or select multipl options
+                    'form_version': 1 # Submissions send only the changed fields, against this version
                 },
                 'buttons': ['Submit Form'],
                 'text_area': None,
@@ -224,7 +344,7 @@ def process_state(human_prompt=None, files=None, data=None):
         return response
 
     # For form submitted data
-    if human_prompt == "form_submitted" and data and "form_data" in data:
+    if human_prompt == "form_submitted" and data and ("form_data" in data or "form_changes" in data):
         response = {
             'session_id': "TEMP_SESSION",
             'user_id': 'temp',
@@ -251,34 +371,158 @@ def process_state(human_prompt=None, files=None, data=None):
     # Return default response for all other cases
     return default_response
 
-def display_form(form_data, mandatory_fields, editable_fields, filter_data, filter_config, message_index):
+def mock_records_page(query_id, cursor, page_size):
+    """Local stand-in for GET /records: the cursor is the row offset into the mock result."""
+    offset = int(cursor or 0)
+    rows = []
+    for n in range(offset, min(offset + page_size, MOCK_RECORDS_TOTAL)):
+        record = dict(MOCK_RECORDS[n % len(MOCK_RECORDS)])
+        record["Reporting DCID"] = 12345 + n
+        rows.append(record)
+    next_offset = offset + len(rows)
+    return {
+        'query_id': query_id,
+        'total': MOCK_RECORDS_TOTAL,
+        'page_size': page_size,
+        'rows': rows,
+        'row_count': len(rows),
+        'next_cursor': str(next_offset) if next_offset < MOCK_RECORDS_TOTAL else None
+    }
+
+class RecordsPageUnavailable(Exception):
+    """A records page could not be fetched; the error has already been shown."""
+
+@st.cache_data(max_entries=512, ttl=600, show_spinner=False)
+def fetch_records_page(session_id, query_id, cursor, page_size):
+    """Fetch one records page; pages already fetched are served from the cache.
+
+    session_id is only part of the cache key: the cache is shared by the whole
+    process and query ids are not unique across users, so pages never cross sessions.
+
+    A failed fetch raises RecordsPageUnavailable rather than returning None,
+    so st.cache_data does not keep the failure and the next try asks again.
+    """
+    if USE_BACKEND:
+        page = backend_fetch_records_page(query_id, cursor, page_size)
+        if page is None:
+            raise RecordsPageUnavailable(query_id)
+        return page
+    return mock_records_page(query_id, cursor, page_size)
+
+def field_options(spec, message_index, selected):
+    """Options for a select widget: the whole list if short, else the top matches for a search box.
+
+    Values in selected are always kept so the widget can show the current choice.
+    """
+    if len(spec.options) <= TYPEAHEAD_THRESHOLD:
+        return spec.options
+    query = st.text_input(
+        "Search options",
+        key=message_key(f"{spec.name}_search", message_index),
+        placeholder=f"Type to search {len(spec.options):,} options",
+        label_visibility="collapsed"
+    )
+    matches = option_index(spec.options, spec.options_digest).search(query)
+    return [value for value in selected if value not in matches] + matches
+
+# Edit/Save/Cancel are on_click callbacks: Streamlit runs them before the
+# (fragment) rerun the click triggers anyway, so one click is one execution.
+
+def form_message(message_index):
+    chat = st.session_state.history[message_index]
+    form_data = chat.form_data or {}
+    return chat.form_schema or compile_form(form_data), form_data
+
+def editor_value(spec, message_index, form_state):
+    """The value currently held by a field's editor widget, committed with the click."""
+    if spec.kind == MULTISELECT:
+        key = f"{spec.name}_multiselect_{message_index}"
+    else:
+        key = f"{spec.name}_{message_index}"
+    value = st.session_state.get(key)
+    if spec.kind == ATTACHMENTS or value is None:
+        return form_state.get(spec.name)
+    if spec.kind == DATE:
+        return value.strftime('%Y-%m-%d')
+    return value
+
+def start_field_edit(message_index, field_name):
+    st.session_state[message_key("edit_mode", message_index)][field_name] = True
+
+def save_field_edit(message_index, field_name):
+    """Validate just this field; it stays in edit mode until it passes."""
+    form_schema, form_data = form_message(message_index)
+    spec = form_schema.by_name[field_name]
+    form_state = st.session_state[message_key("form_state", message_index)]
+    form_state[field_name] = editor_value(spec, message_index, form_state)
+    field_errors = st.session_state[message_key("form_errors", message_index)]
+    errors = spec.validate_change(form_state.get(field_name), form_data.get(field_name))
+    if errors:
+        field_errors[field_name] = errors
+    else:
+        field_errors.pop(field_name, None)
+        st.session_state[message_key("edit_mode", message_index)][field_name] = False
+
+def cancel_field_edit(message_index, field_name):
+    form_schema, form_data = form_message(message_index)
+    spec = form_schema.by_name[field_name]
+    # Revert to original value
+    if field_name in form_data:
+        st.session_state[message_key("form_state", message_index)][field_name] = form_data[field_name]
+
+        # Also revert multiselect values if applicable
+        if spec.kind == MULTISELECT:
+            multiselect_field_key = message_key(f"{field_name}_multiselect", message_index)
+            original = form_data[field_name]
+            st.session_state[message_key("multiselect_values", message_index)][multiselect_field_key] = [
+                v for v in original if spec.index_of(v, None) is not None
+            ] if isinstance(original, list) else []
+
+    # Exit edit mode
+    st.session_state[message_key("form_errors", message_index)].pop(field_name, None)
+    st.session_state[message_key("edit_mode", message_index)][field_name] = False
+
+def on_form_multiselect_change(message_index, field_name):
+    multiselect_field_key = message_key(f"{field_name}_multiselect", message_index)
+    selected_values = st.session_state[multiselect_field_key]
+    st.session_state[message_key("multiselect_values", message_index)][multiselect_field_key] = selected_values
+    st.session_state[message_key("form_state", message_index)][field_name] = selected_values
+
+@st.fragment
+def display_form(form_schema, form_data, form_version, message_index):
     """Display and handle the DCID form with editing capabilities"""
     st.markdown("### DCID Form")
     
     # Safety checks for None values
     form_data = form_data or {}
-    mandatory_fields = mandatory_fields or {}
-    editable_fields = editable_fields or {}
-    filter_data = filter_data or {}
-    filter_config = filter_config or {}
+    if form_schema is None:
+        form_schema = compile_form(form_data)
     
     # Initialize form state if not already in session state
-    form_state_key = f"form_state_{message_index}"
+    form_state_key = message_key("form_state", message_index)
+    form_id_key = message_key("form_id", message_index)
     if form_state_key not in st.session_state:
-        st.session_state[form_state_key] = form_data.copy()
+        # A draft autosaved before the session dropped takes precedence over the server's data,
+        # as long as it was typed into this same form
+        st.session_state[form_id_key] = form_identity(form_data, form_version)
+        draft = get_draft_store().load(st.session_state.draft_id, message_index, st.session_state[form_id_key])
+        st.session_state[form_state_key] = {**form_data, **draft} if draft else form_data.copy()
+        if draft:
+            st.session_state[message_key("draft_saved", message_index)] = dict(st.session_state[form_state_key])
+            st.info("Restored your unsaved edits to this form.")
     
     # Track if any field is in edit mode
-    edit_mode_key = f"edit_mode_{message_index}"
+    edit_mode_key = message_key("edit_mode", message_index)
     if edit_mode_key not in st.session_state:
         st.session_state[edit_mode_key] = {}
     
     # Track multiselect values separately to avoid reloading issues
-    multiselect_key = f"multiselect_values_{message_index}"
+    multiselect_key = message_key("multiselect_values", message_index)
     if multiselect_key not in st.session_state:
         st.session_state[multiselect_key] = {}
     
     # Track if form has been submitted and should be disabled
-    form_disabled_key = f"form_disabled_{message_index}"
+    form_disabled_key = message_key("form_disabled", message_index)
     if form_disabled_key not in st.session_state:
         st.session_state[form_disabled_key] = False
         
@@ -286,38 +530,44 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
     if st.session_state[form_disabled_key]:
         st.success("Form has been submitted successfully! No further edits allowed.")
     
+    form_disabled = st.session_state[form_disabled_key]
+    form_state = st.session_state[form_state_key]
+    edit_mode = st.session_state[edit_mode_key]
+    # Validation errors per field, from the last Save of that field
+    field_errors = st.session_state.setdefault(message_key("form_errors", message_index), {})
+    if not form_disabled:
+        # Executions of the live form, read by benchmarks/bench_rerun.py as runs per click
+        st.session_state.form_runs = st.session_state.get("form_runs", 0) + 1
+
     # Build the form UI
     with st.container():
         # Use a table-like layout for the form
-        for field_name in form_data.keys():
-            field_value = st.session_state[form_state_key].get(field_name, form_data.get(field_name))
-            is_mandatory = mandatory_fields.get(field_name, False)
-            is_editable = editable_fields.get(field_name, False) and not st.session_state[form_disabled_key]
-            field_filters = filter_data.get(field_name)
-            filter_type = filter_config.get(field_name)
+        for spec in form_schema.fields:
+            field_name = spec.name
+            field_value = form_state.get(field_name, form_data.get(field_name))
+            is_editable = spec.editable and not form_disabled
             
             # Display row with field name and value/editor
             col1, col2, col3 = st.columns([2, 5, 1])
             
             # Field label with mandatory indicator
             with col1:
-                label = field_name.replace('_', ' ').title()
-                if is_mandatory:
-                    st.markdown(f"**{label}** <span style='color:red'>*</span>", unsafe_allow_html=True)
+                if spec.mandatory:
+                    st.markdown(f"**{spec.label}** <span style='color:red'>*</span>", unsafe_allow_html=True)
                 else:
-                    st.markdown(f"**{label}**")
+                    st.markdown(f"**{spec.label}**")
             
             # Field value or editor
             with col2:
-                field_key = f"{field_name}_{message_index}"
+                field_key = message_key(field_name, message_index)
                 edit_key = f"{field_name}_edit_{message_index}"
                 
                 # Check if field is in edit mode
-                is_in_edit_mode = st.session_state[edit_mode_key].get(field_name, False) and not st.session_state[form_disabled_key]
+                is_in_edit_mode = edit_mode.get(field_name, False) and not form_disabled
                 
                 if is_in_edit_mode and is_editable:
-                    # Different input types based on field and filter configuration
-                    if field_name == 'detected_date':
+                    # Widget kind was resolved when the form schema was compiled
+                    if spec.kind == DATE:
                         # Calendar input for date
                         date_value = None
                         if field_value and isinstance(field_value, str):
@@ -333,9 +583,9 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
                             label_visibility="collapsed"
                         )
                         # Update form state immediately
-                        st.session_state[form_state_key][field_name] = selected_date.strftime('%Y-%m-%d')
+                        form_state[field_name] = selected_date.strftime('%Y-%m-%d')
                         
-                    elif field_name == 'sample_data_attachements':
+                    elif spec.kind == ATTACHMENTS:
                         # File uploader for attachments
                         uploaded_files = st.file_uploader(
                             "Upload attachments",
@@ -344,65 +594,67 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
                             label_visibility="collapsed"
                         )
                         if uploaded_files:
+                            # Spool/upload each file once; the uploader hands them back on every rerun
+                            stored = st.session_state.setdefault(message_key("form_attachments", message_index), {})
+                            new_files = [file for file in uploaded_files if file.file_id not in stored]
+                            # A failed upload stores nothing, so the files are retried on the next run
+                            for file, handle in zip(new_files, store_attachments(new_files) or ()):
+                                stored[file.file_id] = handle
                             file_names = [file.name for file in uploaded_files]
                             # Update form state immediately
-                            st.session_state[form_state_key][field_name] = file_names
+                            form_state[field_name] = file_names
                             
-                    elif field_filters is not None:
-                        # Dropdown or multiselect based on filter config
-                        if filter_type == 'single':
-                            # Single select dropdown
-                            default_idx = 0
-                            if field_value in field_filters:
-                                default_idx = field_filters.index(field_value)
-                            
-                            selected = st.selectbox(
-                                "Select value",
-                                options=field_filters,
-                                index=default_idx,
-                                key=field_key,
-                                label_visibility="collapsed"
-                            )
-                            # Update form state immediately
-                            st.session_state[form_state_key][field_name] = selected
-                        elif filter_type == 'multi':
-                            # Initialize multiselect value in session state if not present
-                            multiselect_field_key = f"{field_name}_multiselect_{message_index}"
-                            if multiselect_field_key not in st.session_state[multiselect_key]:
-                                # Initialize with current values
-                                if isinstance(field_value, list):
-                                    st.session_state[multiselect_key][multiselect_field_key] = [
-                                        v for v in field_value if v in field_filters
-                                    ]
-                                else:
-                                    st.session_state[multiselect_key][multiselect_field_key] = []
-                            
-                            # Create a callback to update session state when selection changes
-                            def on_multiselect_change():
-                                selected_values = st.session_state[multiselect_field_key]
-                                st.session_state[multiselect_key][multiselect_field_key] = selected_values
-                                st.session_state[form_state_key][field_name] = selected_values
-                            
-                            # Multi-select with persistent values
-                            st.multiselect(
-                                "Select values",
-                                options=field_filters,
-                                default=st.session_state[multiselect_key][multiselect_field_key],
-                                key=multiselect_field_key,
-                                on_change=on_multiselect_change,
-                                label_visibility="collapsed"
-                            )
-                            
-                            # Update form state with current multiselect values
-                            st.session_state[form_state_key][field_name] = st.session_state[multiselect_key][multiselect_field_key]
+                    elif spec.kind == SELECT:
+                        # Single select dropdown (a typeahead shortlist for long option lists)
+                        current = [field_value] if spec.index_of(field_value, None) is not None else []
+                        options = field_options(spec, message_index, current)
+                        if options is spec.options:
+                            default_idx = spec.index_of(field_value)
+                        else:
+                            default_idx = options.index(field_value) if current else 0
+                        selected = st.selectbox(
+                            "Select value",
+                            options=options,
+                            index=default_idx,
+                            key=field_key,
+                            label_visibility="collapsed"
+                        )
+                        # Update form state immediately
+                        form_state[field_name] = selected
+                    elif spec.kind == MULTISELECT:
+                        # Initialize multiselect value in session state if not present
+                        multiselect_field_key = message_key(f"{field_name}_multiselect", message_index)
+                        if multiselect_field_key not in st.session_state[multiselect_key]:
+                            # Initialize with current values
+                            if isinstance(field_value, list):
+                                st.session_state[multiselect_key][multiselect_field_key] = [
+                                    v for v in field_value if spec.index_of(v, None) is not None
+                                ]
+                            else:
+                                st.session_state[multiselect_key][multiselect_field_key] = []
+                        
+                        # Multi-select with persistent values
+                        st.multiselect(
+                            "Select values",
+                            options=field_options(spec, message_index,
+                                                  st.session_state[multiselect_key][multiselect_field_key]),
+                            default=st.session_state[multiselect_key][multiselect_field_key],
+                            key=multiselect_field_key,
+                            on_change=on_form_multiselect_change,
+                            args=(message_index, field_name),
+                            label_visibility="collapsed"
+                        )
+                        
+                        # Update form state with current multiselect values
+                        form_state[field_name] = st.session_state[multiselect_key][multiselect_field_key]
                     else:
                         # Text input for other fields
                         default_text = ""
                         if field_value is not None:
                             default_text = field_value if isinstance(field_value, str) else str(field_value)
                         
-                        if field_name == 'data_concern':
-                            # Use text area for data concern as it's usually longer
+                        if spec.kind == TEXT_AREA:
+                            # Use text area for long free-text fields
                             input_value = st.text_area(
                                 "Enter value",
                                 value=default_text,
@@ -417,35 +669,16 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
                                 label_visibility="collapsed"
                             )
                         # Update form state immediately
-                        st.session_state[form_state_key][field_name] = input_value
+                        form_state[field_name] = input_value
                     
                     # Save/Cancel buttons for edit mode
                     save_col, cancel_col = st.columns(2)
-                    with save_col:
-                        if st.button("Save", key=f"save_{field_key}"):
-                            # Exit edit mode - values already saved
-                            st.session_state[edit_mode_key][field_name] = False
-                            st.rerun()
-                    
-                    with cancel_col:
-                        if st.button("Cancel", key=f"cancel_{field_key}"):
-                            # Revert to original value
-                            if field_name in form_data:
-                                st.session_state[form_state_key][field_name] = form_data[field_name]
-                                
-                                # Also revert multiselect values if applicable
-                                if filter_type == 'multi':
-                                    multiselect_field_key = f"{field_name}_multiselect_{message_index}"
-                                    if isinstance(form_data[field_name], list):
-                                        st.session_state[multiselect_key][multiselect_field_key] = [
-                                            v for v in form_data[field_name] if v in field_filters
-                                        ]
-                                    else:
-                                        st.session_state[multiselect_key][multiselect_field_key] = []
-                            
-                            # Exit edit mode
-                            st.session_state[edit_mode_key][field_name] = False
-                            st.rerun()
+                    save_col.button("Save", key=f"save_{field_key}",
+                                    on_click=save_field_edit, args=(message_index, field_name))
+                    cancel_col.button("Cancel", key=f"cancel_{field_key}",
+                                      on_click=cancel_field_edit, args=(message_index, field_name))
+                    for error in field_errors.get(field_name, []):
+                        st.error(error)
                 else:
                     # Display value in view mode
                     display_value = field_value
@@ -453,45 +686,38 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
                     # Format display based on field type
                     if display_value is None:
                         st.write("None")
-                    elif field_name == 'detected_date' and display_value:
-                        st.write(display_value)
-                    elif field_name == 'sample_data_attachements' and display_value:
-                        if isinstance(display_value, list):
+                    elif isinstance(display_value, list):
+                        if spec.kind == ATTACHMENTS:
                             st.write(", ".join(display_value))
                         else:
-                            st.write(display_value)
-                    elif isinstance(display_value, list):
-                        st.write(", ".join(map(str, display_value)) if display_value else "None")
+                            st.write(", ".join(map(str, display_value)) if display_value else "None")
                     else:
                         st.write(display_value)
             
             # Edit button for editable fields
             with col3:
                 if is_editable and not is_in_edit_mode:
-                    if st.button("Edit", key=edit_key):
-                        st.session_state[edit_mode_key][field_name] = True
-                        st.rerun()
+                    st.button("Edit", key=edit_key, on_click=start_field_edit, args=(message_index, field_name))
                 elif not is_editable:
                     st.write("")
             
             st.divider()
     
     # Submit button for the whole form - only show if form is not disabled
-    if not st.session_state[form_disabled_key]:
+    if not form_disabled:
+        # Autosave: hand the draft to the background writer only when it actually changed
+        draft_saved_key = message_key("draft_saved", message_index)
+        if st.session_state.get(draft_saved_key, form_data) != form_state:
+            get_draft_store().save(st.session_state.draft_id, message_index,
+                                   st.session_state[form_id_key], form_state)
+            st.session_state[draft_saved_key] = dict(form_state)
+        changes = form_schema.changes(form_state, form_data)
+        st.caption(f"{len(changes)} field(s) changed" if changes else "No changes")
         if st.button("Submit Changes", key=f"submit_form_{message_index}"):
             # Validate form before submission
-            form_is_valid = True
-            validation_messages = []
+            validation_messages = form_schema.validate(form_state, form_data)
             
-            # Check mandatory fields
-            for field, is_required in mandatory_fields.items():
-                if is_required:
-                    field_value = st.session_state[form_state_key].get(field)
-                    if field_value is None or (isinstance(field_value, str) and field_value.strip() == ""):
-                        form_is_valid = False
-                        validation_messages.append(f"{field.replace('_', ' ').title()} is required")
-            
-            if form_is_valid:
+            if not validation_messages:
                 # Mark form as disabled to prevent further edits
                 st.session_state[form_disabled_key] = True
                 
@@ -499,15 +725,19 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
                 st.session_state[edit_mode_key] = {}
                 
                 # Add a user message showing submission
-                st.session_state.history.append(Message(
+                append_message(Message(
                     "human", 
                     f"Form submitted with updated data."
                 ))
                 
-                # Process response
-                response = process_state(human_prompt="form_submitted", data={"form_data": st.session_state[form_state_key]})
-                handle_bot_response(response)
-                st.rerun()
+                # Servers that versioned the form only need the changed fields
+                if form_version is not None:
+                    data = {"form_changes": changes, "form_version": form_version}
+                else:
+                    data = {"form_data": form_state}
+                if request_bot_response(human_prompt="form_submitted", data=data):
+                    get_draft_store().discard(st.session_state.draft_id, message_index)
+                    st.rerun()
             else:
                 # Show validation errors
                 for msg in validation_messages:
@@ -516,24 +746,113 @@ def display_form(form_data, mandatory_fields, editable_fields, filter_data, filt
     return st.session_state[form_state_key]
 
 def start_chat(user_id):
+    if USE_BACKEND:
+        backend_start_chat(user_id)
+        return
     st.session_state.session_id = "TEMP_SESSION"
     st.session_state.state = "INITIAL"
 
 def initialize_session_state():
+    if USE_BACKEND and "session_id" not in st.session_state:
+        start_chat(g_user_id)
+        if "session_id" not in st.session_state:
+            # The backend could not be reached (already reported); any rerun tries again
+            st.button("Retry")
+            st.stop()
     required_states = {
         "session_id": g_user_id,
         "state": "INITIAL",
         "history": [],
+        "payloads": {},
+        "message_keys": {},
+        "message_summaries": {},
+        "compacted_upto": -1,
+        "recompact": set(),
+        "capabilities": ["paged_records", "form_delta"] + (["arrow_records"] if ARROW_AVAILABLE else []),
         "user_input": "",
         "text_area_input": "",
         "selected_date": None,
         "uploaded_files": None,
         "first_message_sent": False,
-        "last_interaction_index": -1
+        "last_interaction_index": -1,
+        "pending_request": None,
+        "earlier_pages": 0,
+        "search_index": SearchIndex()
     }
     for key, value in required_states.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    # Form drafts are keyed by an id kept in the URL, so a reconnecting browser finds them again
+    if "draft_id" not in st.session_state:
+        st.session_state.draft_id = st.query_params.get("draft") or uuid.uuid4().hex
+        st.query_params["draft"] = st.session_state.draft_id
+
+def message_key(name, message_index):
+    """Session-state key for per-message data, registered so it can be reclaimed later.
+
+    A key created for a message that was already compacted queues that message
+    to be compacted again on the next run, so late keys are reclaimed too.
+    """
+    key = f"{name}_{message_index}"
+    st.session_state.message_keys.setdefault(message_index, set()).add(key)
+    if (message_index <= st.session_state.compacted_upto
+            and not retains_widget_state(st.session_state.history[message_index])):
+        st.session_state.recompact.add(message_index)
+    return key
+
+def message_value(name, message_index):
+    """Read per-message data, falling back to the compacted summary once it has been reclaimed."""
+    key = f"{name}_{message_index}"
+    if key in st.session_state:
+        return st.session_state[key]
+    summary = st.session_state.message_summaries.get(message_index)
+    return summary.get(name) if summary is not None else None
+
+def summarize_message_keys(message_index):
+    """The few values still shown for a consumed message, as an immutable mapping."""
+    summary = {}
+    for name in ("submitted_date", "submitted_text"):
+        value = st.session_state.get(f"{name}_{message_index}")
+        if value is not None:
+            summary[name] = value
+    files = st.session_state.get(f"files_submitted_{message_index}")
+    if files:
+        # Attachment handles are small (name/size/hash/path) and still drive the previews
+        summary["files_submitted"] = tuple(files)
+    return MappingProxyType(summary) if summary else None
+
+def retains_widget_state(chat):
+    """Messages whose widgets stay usable after the conversation has moved past them.
+
+    Records tables keep paging and exploring, so their keys are never
+    reclaimed. Everything else (forms included) only renders while pending.
+    """
+    return bool(chat.enable_records and chat.records_data)
+
+def compact_consumed_messages():
+    """Drop the widget/session keys of every message behind last_interaction_index.
+
+    Consumed messages no longer render their widgets, so their keys are replaced
+    by a small summary; each index is compacted once, keeping the work per rerun
+    proportional to the number of newly consumed messages (plus any that had
+    keys created after their compaction).
+    """
+    if st.session_state.pending_request:
+        # A streamed turn may still fail and be rolled back; its widgets need their state until then
+        return
+    last_index = st.session_state.last_interaction_index
+    late = sorted(st.session_state.recompact)
+    st.session_state.recompact = set()
+    for message_index in late + list(range(st.session_state.compacted_upto + 1, last_index + 1)):
+        if retains_widget_state(st.session_state.history[message_index]):
+            continue
+        summary = summarize_message_keys(message_index)
+        if summary is not None:
+            st.session_state.message_summaries[message_index] = summary
+        for key in st.session_state.message_keys.pop(message_index, ()):
+            if key in st.session_state:
+                del st.session_state[key]
+    st.session_state.compacted_upto = max(st.session_state.compacted_upto, last_index)
 
 def on_button_click(button_text, message_index):
     # Disable buttons for this message
@@ -541,22 +860,24 @@ def on_button_click(button_text, message_index):
     st.session_state.last_interaction_index = message_index
     
     # Add user's selection to history
-    st.session_state.history.append(Message("human", f"{button_text}"))
+    append_message(Message("human", f"{button_text}"))
     
     # Process response
-    response = process_state(button_text)
-    handle_bot_response(response)
+    request_bot_response(button_text)
 
 def on_text_submit(message_index):
     if st.session_state.user_input:
         st.session_state.last_interaction_index = message_index
-        st.session_state.history.append(Message("human", st.session_state.user_input))
-        response = process_state(st.session_state.user_input)
-        handle_bot_response(response)
-        st.session_state.user_input = ""
+        append_message(Message("human", st.session_state.user_input))
+        if STREAM_RESPONSES:
+            # Put back into the box by stream_pending_response if the streamed reply fails
+            st.session_state.unsent_input = st.session_state.user_input
+        # On failure the text stays in the box so it can be sent again
+        if request_bot_response(st.session_state.user_input):
+            st.session_state.user_input = ""
 
 def on_filter_next(message_index):
-    filter_key = f"filter_selections_{message_index}"
+    filter_key = message_key("filter_selections", message_index)
     
     if st.session_state.get(filter_key) and len(st.session_state[filter_key]) > 0:
         # Get the selected filters
@@ -570,32 +891,32 @@ def on_filter_next(message_index):
         st.session_state.last_interaction_index = message_index
         
         # Add user message showing selections
-        st.session_state.history.append(Message(
+        append_message(Message(
             "human", 
             f"Selected filters: {', '.join(selections)}"
         ))
         
         # Process the response with the filter data
-        response = process_state(data={"filters": selections})
-        handle_bot_response(response)
+        return request_bot_response(data={"filters": selections})
     else:
         st.error("Please select at least one filter option")
+        return False
 
 def on_date_next_click(index):
-    date_key = f"date_{index}"
+    date_key = message_key("date", index)
     if st.session_state.get(date_key):
         selected_date = st.session_state[date_key]
-        st.session_state[f"submitted_date_{index}"] = selected_date
+        st.session_state[message_key("submitted_date", index)] = selected_date
         st.session_state.history[index].enable_calender = False
         st.session_state.last_interaction_index = index
         
-        st.session_state.history.append(
+        append_message(
             Message("human", f"Selected date: {selected_date}")
         )
-        response = process_state(data={"date": str(selected_date)})
-        handle_bot_response(response)
+        return request_bot_response(data={"date": str(selected_date)})
     else:
         st.error("Please select a date")
+        return False
 
 def on_text_area_submit():
     last_text_area_index = None
@@ -604,21 +925,45 @@ def on_text_area_submit():
             last_text_area_index = i
     
     if last_text_area_index is not None:
-        text_input = st.session_state.get(f"text_area_{last_text_area_index}")
+        text_input = st.session_state.get(message_key("text_area", last_text_area_index))
         if text_input:
-            st.session_state[f"submitted_text_{last_text_area_index}"] = text_input
+            st.session_state[message_key("submitted_text", last_text_area_index)] = text_input
             st.session_state.history[last_text_area_index].enable_text_area = False
             st.session_state.last_interaction_index = last_text_area_index
             
-            st.session_state.history.append(
+            append_message(
                 Message("human", f"Submitted: {text_input}")
             )
-            response = process_state(text_input)
-            handle_bot_response(response)
+            request_bot_response(text_input)
+
+def store_attachments(uploaded_files):
+    """Spool uploads to disk and, with a backend, push their bytes in resumable chunks.
+
+    Returns None when the backend upload failed; the error has already been shown.
+    """
+    # Session state only keeps name/size/hash handles, never the file bytes
+    handles = [spool_upload(file) for file in uploaded_files or []]
+    for handle in handles:
+        get_preview_cache().request(handle)
+    if USE_BACKEND and handles and backend_upload_attachments(handles) is None:
+        return None
+    return handles
+
+def attachment_refs(handles):
+    return [{"name": h.name, "size": h.size, "sha256": h.sha256} for h in handles]
+
+@st.cache_data(max_entries=256, show_spinner="Profiling sample data...")
+def profile_attachment(sha256, path, name):
+    # Keyed by content hash, so re-attached extracts are not profiled again
+    return profile_csv(path, name)
+
+def attachment_profiles(handles):
+    """Compact column statistics for CSV sample-data attachments."""
+    return [profile_attachment(h.sha256, h.path, h.name) for h in handles if h.name.lower().endswith(".csv")]
 
 def on_file_upload(message_index):
-    files_key = f"files_{message_index}"
-    submitted_key = f"files_submitted_{message_index}"
+    files_key = message_key("files", message_index)
+    submitted_key = message_key("files_submitted", message_index)
     st.session_state.last_interaction_index = message_index
 
     # FILE UPLOAD IS OPTIONAL
@@ -626,12 +971,25 @@ def on_file_upload(message_index):
     uploaded_files = st.session_state.get(files_key, [])    
     # Process files and update chat - even if no files were uploaded
     file_names = [file.name for file in uploaded_files] if uploaded_files else []
-    st.session_state[submitted_key] = uploaded_files
-    st.session_state.history.append(Message("human", f"Files uploaded: {', '.join(file_names) if file_names else 'No files'}"))
-    response = process_state(files=file_names)
-    handle_bot_response(response)
+    handles = store_attachments(uploaded_files)
+    if handles is None:
+        # Nothing was sent yet; re-enable the uploader so the user can try again
+        rollback_turn()
+        return False
+    st.session_state[submitted_key] = handles
+    append_message(Message("human", f"Files uploaded: {', '.join(file_names) if file_names else 'No files'}"))
+    data = None
+    if handles:
+        # The backend gets hashes plus a profile of any CSV extract, not the raw rows
+        data = {"attachments": attachment_refs(handles)}
+        profiles = attachment_profiles(handles)
+        if profiles:
+            data["profiles"] = profiles
+    if not request_bot_response(files=file_names, data=data):
+        return False
     # Set a flag to indicate files have been processed
-    st.session_state[f"files_processed_{message_index}"] = True
+    st.session_state[message_key("files_processed", message_index)] = True
+    return True
 
     # FILE UPLOAD IS MANDATORY    
     # if st.session_state.get(files_key):
@@ -640,7 +998,7 @@ def on_file_upload(message_index):
         
     #     # Process files and update chat
     #     file_names = [file.name for file in st.session_state[submitted_key]]
-    #     st.session_state.history.append(Message("human", f"Uploaded files: {', '.join(file_names)}"))
+    #     append_message(Message("human", f"Uploaded files: {', '.join(file_names)}"))
     #     response = process_state(files=file_names)
     #     handle_bot_response(response)
         
@@ -649,7 +1007,106 @@ def on_file_upload(message_index):
     # else:
     #     st.error("Please upload files first.")
 
+def request_bot_response(human_prompt=None, files=None, data=None):
+    """Ask the backend for the next bot turn.
+
+    In streaming mode the request is only queued here; main() streams it into
+    a live ai-bubble once the history has been drawn.
+    """
+    if STREAM_RESPONSES:
+        st.session_state.pending_request = {"human_prompt": human_prompt, "files": files, "data": data}
+        return True
+    response = process_state(human_prompt, files, data)
+    if response is None:
+        # The backend call failed (process_state has shown why); undo the turn so it can be retried
+        rollback_turn()
+        return False
+    handle_bot_response(response)
+    return True
+
+def checkpoint_turn():
+    """Remember the conversation as last drawn, so a turn whose backend call fails can be undone.
+
+    Only messages after last_interaction_index can still be interacted with,
+    so those (and their payloads) are the only ones copied.
+    """
+    history = st.session_state.history
+    start = st.session_state.last_interaction_index + 1
+    st.session_state.turn_checkpoint = {
+        "length": len(history),
+        "last_interaction_index": st.session_state.last_interaction_index,
+        "messages": {i: copy.copy(history[i]) for i in range(start, len(history))},
+        "payloads": {i: copy.copy(st.session_state.payloads[i])
+                     for i in range(start, len(history)) if i in st.session_state.payloads},
+    }
+
+def rollback_turn():
+    """Drop the human message of a failed turn and re-enable the widgets it consumed."""
+    checkpoint = st.session_state.get("turn_checkpoint")
+    if checkpoint is None:
+        return
+    history = st.session_state.history
+    length = checkpoint["length"]
+    for i in range(length, len(history)):
+        st.session_state.payloads.pop(i, None)
+    del history[length:]
+    for i, message in checkpoint["messages"].items():
+        history[i] = copy.copy(message)
+        if i in checkpoint["payloads"]:
+            st.session_state.payloads[i] = copy.copy(checkpoint["payloads"][i])
+        # Forget what the failed turn recorded as submitted, so the widget shows again
+        for name in ("submitted_date", "submitted_text", "files_submitted", "files_processed", "form_disabled"):
+            st.session_state.pop(f"{name}_{i}", None)
+        st.session_state.message_summaries.pop(i, None)
+    st.session_state.last_interaction_index = checkpoint["last_interaction_index"]
+    # Messages live again must not count as compacted, or their keys would never be reclaimed
+    st.session_state.compacted_upto = min(st.session_state.compacted_upto, checkpoint["last_interaction_index"])
+    st.session_state.recompact = {i for i in st.session_state.recompact if i <= st.session_state.compacted_upto}
+
+def stream_pending_response():
+    """Render a queued request token by token, then append the finished reply to history."""
+    request = st.session_state.pending_request
+    placeholder = st.empty()
+    texts = {}
+    response = None
+    error = None
+    try:
+        for event in backend_stream_process_state(**request):
+            if event.get("type") == "delta":
+                index = event.get("index", 0)
+                texts[index] = texts.get(index, "") + event.get("main_text", "")
+                placeholder.markdown(
+                    "\n".join(bubble_html("ai", texts[k]) for k in sorted(texts)),
+                    unsafe_allow_html=True
+                )
+            elif event.get("type") == "done":
+                response = event.get("response")
+        if not response:
+            error = "the reply ended before it was complete"
+    except (RequestException, ValueError) as exc:
+        error = str(exc)
+    finally:
+        # Never leave the request queued: a later rerun would send it again
+        st.session_state.pending_request = None
+        unsent_input = st.session_state.pop("unsent_input", None)
+    if error:
+        placeholder.error(f"Could not reach the chat backend, please try again. ({error})")
+        rollback_turn()
+        if unsent_input:
+            # The chat input is drawn after this point, so it can still be refilled
+            st.session_state.user_input = unsent_input
+        if not st.session_state.history:
+            # The greeting itself failed: main() offers a retry instead of an empty chat
+            st.session_state.first_message_sent = False
+        # Shown again in place of the reply after the rerun that restores the widgets
+        st.session_state.turn_error = error
+    else:
+        handle_bot_response(response)
+    st.rerun()
+
 def handle_bot_response(response):
+    # Normalise through the shared contract, so inline mock and backend replies have one shape
+    response = ChatResponse.model_validate(response).model_dump()
     if 'messages' in response:
         for msg in response['messages']:
 
@@ -658,6 +1115,7 @@ def handle_bot_response(response):
             editable_fields = None
             filter_data = None
             filter_config = None
+            form_version = None
             enable_form = msg.get('enable_form', False)
             
             if enable_form and 'data' in msg and msg['data'] is not None:
@@ -666,6 +1124,7 @@ def handle_bot_response(response):
                 editable_fields = msg['data'].get('editable_fields')
                 filter_data = msg['data'].get('filter_data')
                 filter_config = msg['data'].get('filter_config')
+                form_version = msg['data'].get('form_version')
 
             bot_message = Message(
                 origin="ai",
@@ -676,190 +1135,432 @@ def handle_bot_response(response):
                 enable_calender=msg.get('enable_calender', False),
                 enable_attachment=msg.get('enable_attachment', False),
                 enable_records=msg.get('enable_records', False),
-                records_data=msg.get('data'),
                 enable_filter=msg.get('enable_filter', False),
-                filter_data=msg.get('filter_data', [])
+                enable_form=bool(enable_form and form_data)
             )
 
-            # Add form data as custom attributes to the Message object
-            if enable_form and form_data:
-                bot_message.enable_form = True
-                bot_message.form_data = form_data
-                bot_message.mandatory_fields = mandatory_fields
-                bot_message.editable_fields = editable_fields
-                bot_message.filter_data = filter_data
-                bot_message.filter_config = filter_config
-            else:
-                bot_message.enable_form = False
+            # Only messages that actually carry records, filters or a form get a payload entry
+            payload = None
+            if bot_message.enable_form:
+                payload = MessagePayload(
+                    form_data=form_data,
+                    mandatory_fields=mandatory_fields,
+                    editable_fields=editable_fields,
+                    filter_data=filter_data,
+                    filter_config=filter_config,
+                    form_schema=compile_form(form_data, mandatory_fields, editable_fields,
+                                             filter_data, filter_config),
+                    form_version=form_version
+                )
+            elif bot_message.enable_records or msg.get('filter_data'):
+                payload = MessagePayload(
+                    records_data=msg.get('data') if bot_message.enable_records else None,
+                    filter_data=msg.get('filter_data') or []
+                )
 
             # If this is a response after form submission, make sure we disable the old form
             if response.get('state') == 'FORM_SUBMITTED':
                 # Find the most recent form in history and mark it as disabled
                 for i in range(len(st.session_state.history) - 1, -1, -1):
                     if hasattr(st.session_state.history[i], 'enable_form') and st.session_state.history[i].enable_form:
-                        form_disabled_key = f"form_disabled_{i}"
+                        form_disabled_key = message_key("form_disabled", i)
                         st.session_state[form_disabled_key] = True
                         break
 
-            st.session_state.history.append(bot_message)
+            append_message(bot_message, payload)
+
+    update_search_index()
+
+def message_rows(chat):
+    """Records rows held locally for a message (the first page of a paged result)."""
+    if isinstance(chat.records_data, dict):
+        return page_rows(chat.records_data)
+    return chat.records_data or []
+
+def update_search_index():
+    """Index history entries appended since the last call, plus newly submitted texts."""
+    index = st.session_state.search_index
+    history = st.session_state.history
+    for i in range(index.indexed_upto, len(history)):
+        chat = history[i]
+        index.add((i, "message", -1), chat.message or "")
+        if chat.origin == "ai" and chat.enable_text_area:
+            index.awaiting_text.add(i)
+        if chat.enable_records:
+            for row_idx, row in enumerate(message_rows(chat)):
+                index.add((i, "record", row_idx), " ".join(str(v) for v in row.values()))
+    index.indexed_upto = len(history)
+    for i in list(index.awaiting_text):
+        text = message_value("submitted_text", i)
+        if text is not None:
+            index.add((i, "text", -1), text)
+            index.awaiting_text.discard(i)
+
+def search_hit_text(doc):
+    i, field, row_idx = doc
+    chat = st.session_state.history[i]
+    if field == "record":
+        row = message_rows(chat)[row_idx]
+        return "Record: " + ", ".join(f"{k}: {v}" for k, v in row.items())
+    if field == "text":
+        return f"Submitted text: {message_value('submitted_text', i)}"
+    return chat.message
+
+@st.fragment
+def render_search():
+    query = st.text_input("Search conversation", key="search_query", placeholder="Words to find")
+    if not query:
+        return
+    hits = st.session_state.search_index.search(query)
+    if not hits:
+        st.caption("No matches.")
+    for doc in hits:
+        i = doc[0]
+        origin = "You" if st.session_state.history[i].origin == "human" else "Bot"
+        text = search_hit_text(doc)
+        st.markdown(f"**#{i + 1} {origin}** · {text[:160]}")
+
+# Widget blocks below run as fragments: editing them reruns only the block, and
+# they escalate to a full-app st.rerun() only once the conversation moves on.
+
+@st.fragment
+def render_calendar(i):
+    st.write("Select a date")  
+    cols = st.columns([4, 2])
+    with cols[0]:
+        st.date_input("", key=message_key("date", i), value=None, label_visibility="collapsed")
+    with cols[1]:
+        if st.button("Next", key=f"date_btn_{i}"):
+            if on_date_next_click(i):
+                st.rerun()
+
+@st.fragment
+def render_file_uploader(i):
+    files_processed = st.session_state.get(f"files_processed_{i}", False)
+        
+    if not files_processed:
+        cols = st.columns([4, 1])
+        with cols[0]:
+            st.file_uploader(
+                "Upload files",
+                accept_multiple_files=True,
+                key=message_key("files", i),
+                label_visibility="collapsed"
+            )
+            
+        with cols[1]:
+            if st.button(
+                "Next Step",
+                key=f"file_btn_{i}",
+                help="Click after uploading files to proceed"
+            ):
+                if on_file_upload(i):
+                    st.rerun()
+    else:
+        # Show already submitted files
+        if f"files_submitted_{i}" in st.session_state:
+            file_names = [file.name for file in st.session_state[f"files_submitted_{i}"]]
+            st.success(f"Files uploaded: {', '.join(file_names)}")
+
+@st.fragment
+def render_filter(i):
+    chat = st.session_state.history[i]
+    # Check if this filter has been submitted already
+    filter_submitted = getattr(chat, 'filter_submitted', False)
+    
+    if not filter_submitted and i > st.session_state.last_interaction_index:
+        st.subheader("Filter Selection")
+        
+        # Use multiselect for filter selection
+        st.multiselect(
+            "Select items to filter:",
+            options=chat.filter_data,
+            default=chat.filter_selections,
+            key=message_key("filter_selections", i)
+        )
+        
+        # Button to submit filter selections
+        if st.button("Apply Filters", key=f"filter_next_{i}"):
+            if on_filter_next(i):
+                st.rerun()
+    else:
+        # If already submitted, just show the selections
+        if chat.filter_selections:
+            st.success(f"Filters applied: {', '.join(chat.filter_selections)}")
+
+def change_records_page(message_index, page):
+    st.session_state[message_key("records_page", message_index)] = page
+
+@st.fragment
+def render_paged_records(i):
+    """One page of a paged records result, with Prev/Next fetching further pages on demand."""
+    chat = st.session_state.history[i]
+    first_page = chat.records_data
+    total = first_page["total"]
+    page_size = first_page["page_size"]
+    page_count = max(1, -(-total // page_size))
+    page = st.session_state.get(message_key("records_page", i), 0)
+
+    cursors = chat.records_cursors
+    current = first_page
+    if page > 0:
+        try:
+            current = fetch_records_page(st.session_state.session_id, first_page["query_id"], cursors[page], page_size)
+        except RecordsPageUnavailable:
+            # Fall back to the first page, which came with the message; Next tries again
+            page = st.session_state[message_key("records_page", i)] = 0
+    # Remember where the next page starts so it can be fetched when asked for
+    if current.get("next_cursor") is not None and len(cursors) == page + 1:
+        cursors.append(current["next_cursor"])
+
+    # Arrow pages go straight to st.dataframe as a pyarrow.Table, JSON pages via pandas
+    st.dataframe(
+        page_frame(current, (st.session_state.session_id, first_page["query_id"], cursors[page], page_size)),
+        column_config=RECORDS_COLUMN_CONFIG,
+        use_container_width=True,
+        hide_index=True
+    )
+    start = page * page_size
+    cols = st.columns([1, 4, 1])
+    cols[0].button("Prev", key=f"records_prev_{i}", disabled=page == 0,
+                   on_click=change_records_page, args=(i, page - 1))
+    cols[1].caption(f"Rows {start + 1}-{start + page_row_count(current)} of {total} (page {page + 1}/{page_count})")
+    cols[2].button("Next", key=f"records_next_{i}", disabled=len(cursors) <= page + 1,
+                   on_click=change_records_page, args=(i, page + 1))
+
+def load_result_rows(first_page):
+    """Every row of a paged result (up to MAX_ENGINE_ROWS), fetched once in large pages.
+
+    Raises RecordsPageUnavailable if a page fails, so no engine is built from part of the result.
+    """
+    rows = list(page_rows(first_page))
+    page = first_page
+    while page.get("next_cursor") is not None and len(rows) < MAX_ENGINE_ROWS:
+        page = fetch_records_page(st.session_state.session_id, first_page["query_id"], page["next_cursor"],
+                                  ENGINE_PAGE_SIZE)
+        rows.extend(page_rows(page))
+    return rows
+
+def message_records_engine(i):
+    records = st.session_state.history[i].records_data
+    if isinstance(records, dict):
+        # The engine cache is process-wide, so the key is scoped to this session like the pages
+        return records_engine(records, load_result_rows,
+                              key=("query", st.session_state.session_id, records["query_id"], records["total"]))
+    return records_engine(records, list)
+
+@st.fragment
+def render_records_explorer(i):
+    """Filter / sort / group-by controls for a records message, answered by the local engine."""
+    if not st.toggle("Filter, sort and group", key=message_key("records_explore", i)):
+        return
+    try:
+        engine = message_records_engine(i)
+    except RecordsPageUnavailable:
+        # Nothing was cached, so switching the explorer off and on again retries the load
+        return
+
+    selections = {}
+    cols = st.columns(max(1, len(engine.indexes)))
+    for n, column in enumerate(engine.indexes):
+        selections[column] = cols[n].multiselect(column, engine.values(column),
+                                                 key=message_key(f"records_where_{column}", i))
+    cols = st.columns([2, 1, 2])
+    sort_by = cols[0].selectbox("Sort by", ["(none)"] + engine.columns, key=message_key("records_sort", i))
+    descending = cols[1].checkbox("Descending", key=message_key("records_desc", i))
+    group_by = cols[2].selectbox("Group by", ["(none)"] + list(engine.indexes), key=message_key("records_group", i))
+
+    positions = engine.filter(selections)
+    if group_by != "(none)":
+        st.dataframe(engine.group_by(positions, group_by), use_container_width=True, hide_index=True)
+    else:
+        if sort_by != "(none)":
+            positions = engine.sort(positions, sort_by, descending)
+        st.dataframe(engine.frame(positions), column_config=RECORDS_COLUMN_CONFIG,
+                     use_container_width=True, hide_index=True)
+    st.caption(f"{len(positions)} of {engine.size} records")
+
+def attachment_previews(handles):
+    """Thumbnails / header rows for uploaded files, or a placeholder while they are generated.
+
+    Returns True once every preview has been drawn.
+    """
+    preview_cache = get_preview_cache()
+    cols = st.columns(min(len(handles), 4))
+    ready = True
+    for n, handle in enumerate(handles):
+        with cols[n % len(cols)]:
+            preview = preview_cache.get(handle)
+            if preview is None:
+                ready = False
+                st.caption(f"{handle.name}: generating preview...")
+            elif preview.kind == "image":
+                st.image(preview.image, caption=handle.name)
+            elif preview.kind == "table":
+                st.caption(handle.name)
+                st.dataframe(pd.DataFrame(preview.rows, columns=preview.columns), hide_index=True)
+            else:
+                st.caption(handle.name)
+    return ready
+
+def poll_attachment_previews(handles):
+    # Once the last preview is in, rerun the app so render_history swaps in the non-polling
+    # fragment; otherwise run_every would keep rerunning this block every second for good
+    if attachment_previews(handles):
+        st.rerun()
+
+# While any preview is still pending the block polls on its own; the script rerun never waits on it
+render_previews = st.fragment(attachment_previews)
+render_previews_polling = st.fragment(run_every=1)(poll_attachment_previews)
+
+def render_history(start, end):
+    """Render history[start:end], batching finished bubbles into shared markdown blocks."""
+    static_bubbles = []
+    for i in range(start, end):
+        chat = st.session_state.history[i]
+        # Finished messages only contribute their cached bubble to a shared markdown block
+        if not has_live_elements(i, chat):
+            if chat.message:
+                static_bubbles.append(message_html(chat))
+            continue
+        flush_static_bubbles(static_bubbles)
+
+        # Message bubbles
+        if chat.message:
+            st.markdown(message_html(chat), unsafe_allow_html=True)
+
+        # Interactive elements
+        if chat.origin == "ai":
+            # Buttons
+            if chat.buttons and not chat.buttons_disabled and i > st.session_state.last_interaction_index:
+                cols = st.columns(len(chat.buttons))
+                for idx, btn_text in enumerate(chat.buttons):
+                    cols[idx].button(btn_text, key=f"btn_{i}_{idx}", 
+                                  on_click=on_button_click, args=(btn_text, i))
+            
+            # Calendar
+            if chat.enable_calender and i > st.session_state.last_interaction_index:
+                render_calendar(i)
+
+            submitted_date = message_value("submitted_date", i)
+            if submitted_date is not None:
+                st.info(f"Selected Date: {submitted_date}")
+
+            # Display file uploader if enabled
+            if chat.enable_attachment and i > st.session_state.last_interaction_index:
+                render_file_uploader(i)
+
+            # Previews of uploaded attachments
+            attachments = message_value("files_submitted", i)
+            if attachments:
+                handles = tuple(attachments)
+                if all(get_preview_cache().get(handle) is not None for handle in handles):
+                    render_previews(handles)
+                else:
+                    render_previews_polling(handles)
+
+            # Text Area
+            if chat.enable_text_area and i > st.session_state.last_interaction_index:
+                with st.form(key=f"text_form_{i}", clear_on_submit=True):
+                    st.text_area("Your response", key=message_key("text_area", i))
+                    st.form_submit_button("Submit", on_click=on_text_area_submit)
+            
+            # Display records
+            if chat.enable_records and chat.records_data:
+                st.subheader("Records Data")
+                if isinstance(chat.records_data, dict) and "total" in chat.records_data:
+                    render_paged_records(i)
+                else:
+                    st.dataframe(
+                        records_frame(chat.records_data),
+                        column_config=RECORDS_COLUMN_CONFIG,
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                render_records_explorer(i)
+
+            # Show submitted content
+            submitted_text = message_value("submitted_text", i)
+            if submitted_text is not None:
+                with st.container(): 
+                    with st.expander("Submitted Text"):
+                        st.write(submitted_text)
+            
+            # Filter UI
+            if chat.enable_filter and chat.filter_data:
+                render_filter(i)
+
+
+            if hasattr(chat, 'enable_form') and chat.enable_form and i > st.session_state.last_interaction_index:
+                with st.container():
+                    st.markdown("""
+                    <style>
+                    .form-container {
+                        border: 1px solid #ccc;
+                        border-radius: 10px;
+                        padding: 20px;
+                        margin: 10px 0;
+                        background-color: #f9f9f9;
+                    }
+                    </style>
+                    """, unsafe_allow_html=True)
+                    
+                    with st.expander("View/Edit Form", expanded=True):
+                        display_form(chat.form_schema, chat.form_data, chat.form_version, i)
+
+
+    flush_static_bubbles(static_bubbles)
+
+def load_earlier_page():
+    st.session_state.earlier_pages += 1
+
+def hide_earlier_messages():
+    st.session_state.earlier_pages = 0
+
+def render_earlier_messages(window_start):
+    """Collapsed block for turns older than the live window, loaded a page at a time."""
+    loaded = min(st.session_state.earlier_pages * EARLIER_PAGE_SIZE, window_start)
+    # A bordered container rather than an expander: history can itself contain expanders
+    with st.container(border=True):
+        st.caption(f"Earlier messages ({window_start})")
+        if loaded < window_start:
+            st.button("Load earlier messages", key="load_earlier", on_click=load_earlier_page)
+        if loaded:
+            render_history(window_start - loaded, window_start)
+            st.button("Hide earlier messages", key="hide_earlier", on_click=hide_earlier_messages)
 
 def main():
     load_css()
     initialize_session_state()
+    compact_consumed_messages()
     st.title("Interactive Chatbot 🤖")
+    with st.sidebar:
+        render_search()
 
     if not st.session_state.first_message_sent:
-        response = process_state()
-        handle_bot_response(response)
-        st.session_state.first_message_sent = True
+        if "turn_error" in st.session_state:
+            # A streamed greeting failed; wait for Retry rather than re-sending in a loop
+            st.error(f"Could not reach the chat backend, please try again. ({st.session_state.pop('turn_error')})")
+        else:
+            st.session_state.first_message_sent = request_bot_response()
+        if not st.session_state.first_message_sent:
+            # Nothing to interact with yet; any rerun asks for the greeting again
+            st.button("Retry")
 
     # Display chat history
     chat_container = st.container()
     with chat_container:
-        for i, chat in enumerate(st.session_state.history):
-            # Message bubbles
-            if chat.message:
-                st.markdown(f"""
-                <div class="chat-row {'row-reverse' if chat.origin == 'human' else ''}">
-                    <img class="chat-icon" src="static/{'user_icon.png' if chat.origin == 'human' else 'ai_icon.png'}" width=32 height=32>
-                    <div class="chat-bubble {'human-bubble' if chat.origin == 'human' else 'ai-bubble'}">
-                        &#8203;{chat.message}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-
-            # Interactive elements
-            if chat.origin == "ai":
-                # Buttons
-                if chat.buttons and not chat.buttons_disabled and i > st.session_state.last_interaction_index:
-                    cols = st.columns(len(chat.buttons))
-                    for idx, btn_text in enumerate(chat.buttons):
-                        cols[idx].button(btn_text, key=f"btn_{i}_{idx}", 
-                                      on_click=on_button_click, args=(btn_text, i))
-                
-                # Calendar
-                if chat.enable_calender and i > st.session_state.last_interaction_index:
-                    st.write("Select a date")  
-                    cols = st.columns([4, 2])
-                    with cols[0]:
-                        st.date_input("", key=f"date_{i}", value=None, label_visibility="collapsed")
-                    with cols[1]:
-                        st.button("Next", key=f"date_btn_{i}", on_click=on_date_next_click, args=(i,))
-
-                if f"submitted_date_{i}" in st.session_state:
-                    st.info(f"Selected Date: {st.session_state[f'submitted_date_{i}']}")
-
-                # Display file uploader if enabled
-                if chat.enable_attachment and i > st.session_state.last_interaction_index:
-                    files_processed = st.session_state.get(f"files_processed_{i}", False)
-                        
-                    if not files_processed:
-                        cols = st.columns([4, 1])
-                        with cols[0]:
-                            st.file_uploader(
-                                "Upload files",
-                                accept_multiple_files=True,
-                                key=f"files_{i}",
-                                label_visibility="collapsed"
-                            )
-                            
-                        with cols[1]:
-                            st.button(
-                                "Next Step",
-                                key=f"file_btn_{i}",
-                                on_click=on_file_upload,
-                                args=(i,),
-                                help="Click after uploading files to proceed"
-                            )
-                    else:
-                        # Show already submitted files
-                        if f"files_submitted_{i}" in st.session_state:
-                            file_names = [file.name for file in st.session_state[f"files_submitted_{i}"]]
-                            st.success(f"Files uploaded: {', '.join(file_names)}")
-                
-                # Text Area
-                if chat.enable_text_area and i > st.session_state.last_interaction_index:
-                    with st.form(key=f"text_form_{i}", clear_on_submit=True):
-                        st.text_area("Your response", key=f"text_area_{i}")
-                        st.form_submit_button("Submit", on_click=on_text_area_submit)
-                
-                # Display records
-                if chat.enable_records and chat.records_data:
-                    st.subheader("Records Data")
-                    records_df = pd.DataFrame(chat.records_data)
-                    
-                    st.dataframe(
-                        records_df,
-                        column_config={
-                            "Reporting DCID": st.column_config.NumberColumn("Reporting DCID"),
-                            "Phase": st.column_config.TextColumn("Phase"),
-                            "Data Owner": st.column_config.TextColumn("Data Owner"),
-                            "Status Label": st.column_config.TextColumn("Status Label"),
-                            "Created Date": st.column_config.DateColumn("Created Date")
-                        },
-                        use_container_width=True,
-                        hide_index=True
-                    )
-
-                # Show submitted content
-                if f"submitted_text_{i}" in st.session_state:
-                    with st.container(): 
-                        with st.expander("Submitted Text"):
-                            st.write(st.session_state[f"submitted_text_{i}"])
-                
-                # Filter UI
-                if chat.enable_filter and chat.filter_data:
-                    # Check if this filter has been submitted already
-                    filter_submitted = getattr(chat, 'filter_submitted', False)
-                    
-                    if not filter_submitted and i > st.session_state.last_interaction_index:
-                        st.subheader("Filter Selection")
-                        
-                        # Use multiselect for filter selection
-                        st.multiselect(
-                            "Select items to filter:",
-                            options=chat.filter_data,
-                            default=chat.filter_selections,
-                            key=f"filter_selections_{i}"
-                        )
-                        
-                        # Button to submit filter selections
-                        st.button(
-                            "Apply Filters", 
-                            key=f"filter_next_{i}", 
-                            on_click=on_filter_next, 
-                            args=(i,)
-                        )
-                    else:
-                        # If already submitted, just show the selections
-                        if chat.filter_selections:
-                            st.success(f"Filters applied: {', '.join(chat.filter_selections)}")
-
-
-                if hasattr(chat, 'enable_form') and chat.enable_form and i > st.session_state.last_interaction_index:
-                    with st.container():
-                        st.markdown("""
-                        <style>
-                        .form-container {
-                            border: 1px solid #ccc;
-                            border-radius: 10px;
-                            padding: 20px;
-                            margin: 10px 0;
-                            background-color: #f9f9f9;
-                        }
-                        </style>
-                        """, unsafe_allow_html=True)
-                        
-                        with st.expander("View/Edit Form", expanded=True):
-                            display_form(
-                                chat.form_data, 
-                                chat.mandatory_fields, 
-                                chat.editable_fields, 
-                                chat.filter_data, 
-                                chat.filter_config,
-                                i
-                            )
+        history_len = len(st.session_state.history)
+        window_start = max(0, history_len - HISTORY_WINDOW)
+        if window_start:
+            render_earlier_messages(window_start)
+        render_history(window_start, history_len)
 
+        # Streamed reply for the turn just submitted
+        if st.session_state.pending_request:
+            stream_pending_response()
+        elif "turn_error" in st.session_state:
+            st.error(f"Could not reach the chat backend, please try again. ({st.session_state.pop('turn_error')})")
 
     # Text input at bottom
     if st.session_state.history and \
@@ -895,6 +1596,7 @@ def main():
         height=0,
         width=0,
     )
+    checkpoint_turn()
 
 
 if __name__ == "__main__":